@@ -1,61 +1,177 @@
-import json
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+try:
+    import simdjson
+    _parser = simdjson.Parser()  # Reused across rows; the parser owns the tape buffer
+except ImportError:
+    simdjson = None
+import os
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
+from psycopg2.extras import execute_values
 from database import Database
 from pricing_engine import PriceAnalyzer
 import logging
 
 logging.basicConfig(level=logging.INFO)
 
+BATCH_SIZE = 1000
+ANALYZER_KEYS = ("meta", "new", "used")  # Only branches PriceAnalyzer reads
+_SNIPER_FIELDS = itemgetter("rating", "profit_abs", "margin_pct")
+
+def _load_item(json_data):
+    """
+    Parses an item blob, materializing only the branches PriceAnalyzer touches.
+    Every branch comes back as plain Python objects: simdjson proxies point into the parser's
+    buffer and would be invalidated when the next row is parsed.
+    """
+    if simdjson is None:
+        return _json.loads(json_data)
+
+    buf = json_data if isinstance(json_data, (bytes, bytearray)) else json_data.encode()
+    doc = _parser.parse(buf)
+    try:
+        data = {}
+        for key in ANALYZER_KEYS:
+            if key in doc:
+                branch = doc[key]
+                if isinstance(branch, simdjson.Object):
+                    data[key] = branch.as_dict()
+                elif isinstance(branch, simdjson.Array):
+                    data[key] = branch.as_list()
+                else:
+                    data[key] = branch  # Scalars (str/int/float/bool/None) are already Python values
+                del branch
+        return data
+    finally:
+        # Proxies must be gone before the parser is reused for the next row
+        del doc
+
+def _flush_batch(db, batch):
+    """Writes a batch of (item_id, rating, profit, margin) tuples in a single UPDATE ... FROM VALUES."""
+    if not batch:
+        return
+    db.cursor.execute("SET LOCAL synchronous_commit = off")  # Rerunnable backfill; no need to wait on the WAL flush
+    execute_values(db.cursor, """
+        UPDATE items
+        SET cached_rating = data.r, cached_profit = data.p, cached_margin = data.m
+        FROM (VALUES %s) AS data(item_id, r, p, m)
+        WHERE items.item_id = data.item_id
+    """, batch, template="(%s, %s, %s::real, %s::real)", page_size=BATCH_SIZE)
+    db.conn.commit()
+
+def _push_down_cached_columns(db):
+    """
+    Fills cached columns inside Postgres for rows whose result is known without Python analysis:
+    no New stock listings at all. PriceAnalyzer only builds a sniper block from the cleaned New
+    stock (_analyze_investment_potential: `if stock:`), so these rows always get ('N/A', 0, 0),
+    the same defaults _analyze_one and save_item use. Everything else goes through PriceAnalyzer.
+    Runs in keyset-ordered batches of BATCH_SIZE rows, each its own transaction, so locks and WAL
+    stay bounded. Returns the number of rows updated.
+    """
+    updated = 0
+    last_id = ""
+    try:
+        while True:
+            db.cursor.execute("SET LOCAL synchronous_commit = off")
+            db.cursor.execute("""
+                WITH batch AS (
+                    SELECT item_id FROM items
+                    WHERE cached_rating IS NULL AND item_id > %s
+                    ORDER BY item_id
+                    LIMIT %s
+                ), pushed AS (
+                    UPDATE items
+                    SET cached_rating = 'N/A', cached_profit = 0, cached_margin = 0
+                    FROM batch
+                    WHERE items.item_id = batch.item_id
+                      AND COALESCE(items.json_data::jsonb #> '{new,stock}', '[]'::jsonb) = '[]'::jsonb
+                    RETURNING 1
+                )
+                SELECT (SELECT MAX(item_id) FROM batch), (SELECT COUNT(*) FROM pushed)
+            """, (last_id, BATCH_SIZE))
+            last_id, count = db.cursor.fetchone()
+            db.conn.commit()
+            if last_id is None:
+                return updated
+            updated += count
+    except Exception as e:
+        # e.g. a corrupted blob that won't cast to jsonb; the Python path handles the remaining rows
+        db.conn.rollback()
+        logging.warning(f"Server-side backfill stopped after {updated} rows: {e}")
+        return updated
+
+def _analyze_one(row):
+    """
+    Worker: parses and analyzes a single (item_id, json_data) row.
+    Returns (item_id, (rating, profit, margin), None) or (item_id, None, error message).
+    """
+    item_id, json_data = row[0], row[1]
+    try:
+        # Specific error handling for corrupted JSON
+        try:
+            data = _load_item(json_data)
+        except ValueError as e:
+            return item_id, None, f"Corrupted JSON for {item_id}: {e}"
+
+        analysis = PriceAnalyzer(data).analyze()
+
+        try:
+            return item_id, _SNIPER_FIELDS(analysis["deep_dive"]["sniper"]), None
+        except (KeyError, TypeError):
+            # No sniper block (e.g. no New listings) -> same defaults save_item caches
+            return item_id, ("N/A", 0, 0), None
+    except Exception as e:
+        return item_id, None, f"Failed to process {item_id}: {e}"
+
 def backfill_cached_columns():
     """Backfill cached_rating, cached_profit, cached_margin for existing items."""
     db = Database()
-    
-    # Get all items with NULL cached columns
-    db.cursor.execute("SELECT item_id, json_data FROM items WHERE cached_rating IS NULL")
-    rows = db.cursor.fetchall()
-    
-    total = len(rows)
+
+    pushed_down = _push_down_cached_columns(db)
+    logging.info(f"Backfilled {pushed_down} items server-side")
+
+    db.cursor.execute("SELECT COUNT(*) FROM items WHERE cached_rating IS NULL")
+    total = db.cursor.fetchone()[0]
     logging.info(f"Backfilling {total} items...")
-    
+
     success_count = 0
     error_count = 0
-    
-    for i, row in enumerate(rows, 1):
-        item_id, json_data = row[0], row[1]
-        
-        try:
-            # Specific error handling for corrupted JSON
-            try:
-                data = json.loads(json_data)
-            except json.JSONDecodeError as e:
-                logging.error(f"Corrupted JSON for {item_id}: {e}")
-                error_count += 1
-                continue
-            
-            analysis = PriceAnalyzer(data).analyze()
-            
-            rating = analysis.get("deep_dive", {}).get("sniper", {}).get("rating", "N/A")
-            profit = analysis.get("deep_dive", {}).get("sniper", {}).get("profit_abs", 0)
-            margin = analysis.get("deep_dive", {}).get("sniper", {}).get("margin_pct", 0)
-            
-            db.cursor.execute("""
-                UPDATE items 
-                SET cached_rating = %s, cached_profit = %s, cached_margin = %s
-                WHERE item_id = %s
-            """, (rating, profit, margin, item_id))
-            
-            success_count += 1
-            if i % 10 == 0:
-                db.conn.commit()
-                logging.info(f"Progress: {i}/{total} ({i/total*100:.1f}%) | Success: {success_count} | Errors: {error_count}")
-                
-        except Exception as e:
-            logging.error(f"Failed to process {item_id}: {e}")
-            error_count += 1
-            continue
-    
+    processed = 0
+
+    # PriceAnalyzer is pure CPU and independent per item, so fan it out across cores.
+    # Rows stream from a server-side cursor (WITH HOLD survives the per-batch commits);
+    # UPDATEs go through db.cursor so the stream isn't invalidated.
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor, \
+            db.conn.cursor(name="backfill_stream", withhold=True) as stream:
+        stream.itersize = BATCH_SIZE
+        # As text: the workers parse (only the branches they need) instead of this process decoding full jsonb
+        stream.execute("SELECT item_id, json_data::text FROM items WHERE cached_rating IS NULL")
+
+        while True:
+            page = stream.fetchmany(BATCH_SIZE)
+            if not page:
+                break
+
+            batch = []
+            for item_id, values, error in executor.map(_analyze_one, page, chunksize=64):
+                if error:
+                    logging.error(error)
+                    error_count += 1
+                    continue
+
+                batch.append((item_id, *values))
+                success_count += 1
+
+            _flush_batch(db, batch)
+            processed += len(page)
+            logging.info(f"Progress: {processed}/{total} ({processed/max(total, 1)*100:.1f}%) | Success: {success_count} | Errors: {error_count}")
+
     db.conn.commit()
     db.close()
-    
+
     logging.info(f"Backfill complete: {success_count}/{total} items updated, {error_count} errors")
 
 if __name__ == "__main__":
@@ -0,0 +1,36 @@
+from database import Database
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+def backfill_inventory_edges(db):
+    """
+    Populate inventory_edges for inventory lists saved before the table existed.
+    Lists that aren't JSON arrays are skipped rather than failing the whole backfill.
+    """
+    try:
+        db.cursor.execute("SET LOCAL synchronous_commit = off")  # Rerunnable backfill; no need to wait on the WAL flush
+        # Expand each stored list server-side; sets that already have edges are left alone
+        db.cursor.execute("""
+            INSERT INTO inventory_edges (set_id, fig_id, qty)
+            SELECT l.set_id, f ->> 'id', SUM(COALESCE((f ->> 'qty')::int, (f ->> 'quantity')::int, 1))
+            FROM inventory_lists l
+            CROSS JOIN LATERAL jsonb_array_elements(l.json_data::jsonb) AS f
+            WHERE jsonb_typeof(l.json_data::jsonb) = 'array'
+              AND f ->> 'id' IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM inventory_edges e WHERE e.set_id = l.set_id)
+            GROUP BY l.set_id, f ->> 'id'
+        """)
+        inserted = db.cursor.rowcount
+        db.conn.commit()
+        logging.info(f"Backfill complete: {inserted} inventory edges inserted")
+    except Exception as e:
+        db.conn.rollback()
+        logging.error(f"Inventory edge backfill failed: {e}")
+
+if __name__ == "__main__":
+    db = Database()
+    try:
+        backfill_inventory_edges(db)
+    finally:
+        db.close()
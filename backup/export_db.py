@@ -1,34 +1,76 @@
-
 import sqlite3
-import json
+try:
+    import orjson
+    def _dumps(obj): return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    import json
+    def _dumps(obj): return json.dumps(obj, indent=2).encode("utf-8")
+
+FETCH_SIZE = 10000
+
+# Read-path tuning: WAL so the export never blocks a writer, 256MB page cache, 1GB mmap
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "cache_size=-262144",
+    "mmap_size=1073741824",
+    "temp_store=MEMORY",
+)
+
+RECORD_INDENT = b"\n    "  # Records sit two levels deep, laid out like json.dump(export, f, indent=2)
+
+def _write_section(f, cursor, name, query, to_record, first_section=False):
+    """Streams one query's rows into the open file as an indented JSON array. Returns the row count."""
+    if not first_section:
+        f.write(b',')
+    f.write(b'\n  "' + name.encode("utf-8") + b'": [')
+
+    cursor.execute(query)
+    count = 0
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        for r in rows:
+            if count:
+                f.write(b',')
+            # JSON strings never hold a raw newline, so re-indenting the record's lines is safe
+            f.write(RECORD_INDENT + _dumps(to_record(r)).replace(b"\n", RECORD_INDENT))
+            count += 1
+
+    f.write(b'\n  ]' if count else b']')
+    return count
 
 def export_to_json(db_path="bricklink_data.db", json_out="bricklink_data.json"):
     conn = sqlite3.connect(db_path)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}")
     cursor = conn.cursor()
-    
-    export = {"items": [], "inventory": [], "collections": []}
-    
-    # Items
-    cursor.execute("SELECT item_id, json_data, updated_at FROM items")
-    for r in cursor.fetchall():
-        export["items"].append({"id": r[0], "data": r[1], "updated_at": r[2]})
-        
-    # Inventory
-    cursor.execute("SELECT set_id, json_data, updated_at FROM inventory_lists")
-    for r in cursor.fetchall():
-        export["inventory"].append({"id": r[0], "data": r[1], "updated_at": r[2]})
-        
-    # Collections
-    cursor.execute("SELECT item_id, collection_name, added_at FROM collections")
-    for r in cursor.fetchall():
-        export["collections"].append({"item_id": r[0], "collection_name": r[1], "added_at": r[2]})
-        
+
+    # Rows are written as they are fetched, so the full export never sits in memory
+    with open(json_out, "wb") as f:
+        f.write(b'{')
+
+        # Items
+        item_count = _write_section(f, cursor, "items",
+            "SELECT item_id, json_data, updated_at FROM items",
+            lambda r: {"id": r[0], "data": r[1], "updated_at": r[2]}, first_section=True)
+
+        # Inventory
+        _write_section(f, cursor, "inventory",
+            "SELECT set_id, json_data, updated_at FROM inventory_lists",
+            lambda r: {"id": r[0], "data": r[1], "updated_at": r[2]})
+
+        # Collections
+        _write_section(f, cursor, "collections",
+            "SELECT item_id, collection_name, added_at FROM collections",
+            lambda r: {"item_id": r[0], "collection_name": r[1], "added_at": r[2]})
+
+        f.write(b'\n}')
+
     conn.close()
-    
-    with open(json_out, "w", encoding="utf-8") as f:
-        json.dump(export, f, indent=2)
-    
-    print(f"Exported {len(export['items'])} items to {json_out}")
+
+    print(f"Exported {item_count} items to {json_out}")
 
 if __name__ == "__main__":
     export_to_json()
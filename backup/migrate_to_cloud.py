@@ -1,9 +1,8 @@
 import sqlite3
-import json
 import os
 import toml
 import streamlit as st
-from database import Database
+from database import Database, copy_buffer
 from tqdm import tqdm
 
 def load_secrets():
@@ -19,6 +18,68 @@ def load_secrets():
         print("Secrets file not found!")
         exit(1)
 
+FETCH_SIZE = 5000
+
+def copy_upsert(cloud_cursor, table, columns, local_cursor, conflict_clause):
+    """
+    Streams the local cursor's result set into a temp table with COPY (one chunk at a time),
+    then upserts it into the target table with a single INSERT ... SELECT.
+    Returns the number of rows copied.
+    """
+    tmp_table = f"tmp_{table}"
+    cols = ", ".join(columns)
+    cloud_cursor.execute(f"CREATE TEMP TABLE {tmp_table} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+
+    count = 0
+    with tqdm(unit="rows") as progress:
+        while True:
+            chunk = local_cursor.fetchmany(FETCH_SIZE)
+            if not chunk:
+                break
+
+            cloud_cursor.copy_expert(f"COPY {tmp_table} ({cols}) FROM STDIN WITH (FORMAT text)", copy_buffer(chunk))
+            count += len(chunk)
+            progress.update(len(chunk))
+
+    cloud_cursor.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {tmp_table} {conflict_clause}")
+    return count
+
+def drop_secondary_indexes(cloud_db, tables):
+    """
+    Drops plain secondary indexes on the given tables and returns their definitions for rebuilding.
+    Unique/primary indexes and any index backing a constraint stay, so the load is still checked
+    and no DROP INDEX hits a constraint-owned index.
+    Runs in autocommit ahead of the load: DROP INDEX CONCURRENTLY doesn't take the ACCESS EXCLUSIVE
+    lock a transactional DROP would hold on the live tables until the load commits.
+    """
+    cloud_db.conn.autocommit = True  # DROP INDEX CONCURRENTLY can't run inside a transaction
+    try:
+        cloud_db.cursor.execute('''
+            SELECT ic.relname, pg_get_indexdef(x.indexrelid)
+            FROM pg_index x
+            JOIN pg_class ic ON ic.oid = x.indexrelid
+            JOIN pg_class tc ON tc.oid = x.indrelid
+            WHERE tc.relnamespace = current_schema()::regnamespace AND tc.relname = ANY(%s)
+              AND NOT x.indisunique AND NOT x.indisprimary
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+        ''', (list(tables),))
+        index_defs = cloud_db.cursor.fetchall()
+        for name, _ in index_defs:
+            cloud_db.cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+    finally:
+        cloud_db.conn.autocommit = False
+    return index_defs
+
+def rebuild_indexes(cloud_db, index_defs):
+    """Re-creates dropped indexes after the load (CONCURRENTLY, so the live app isn't blocked)."""
+    cloud_db.conn.autocommit = True  # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    try:
+        cloud_db.cursor.execute("SET maintenance_work_mem = '512MB'")
+        for name, indexdef in tqdm(index_defs):
+            cloud_db.cursor.execute(indexdef.replace(" INDEX ", " INDEX CONCURRENTLY IF NOT EXISTS ", 1))
+    finally:
+        cloud_db.conn.autocommit = False
+
 def migrate():
     print("Starting Migration to Supabase...")
     
@@ -34,64 +95,62 @@ def migrate():
 
     conn = sqlite3.connect(local_db_path)
     cursor = conn.cursor()
+    cursor.arraysize = FETCH_SIZE
+    # One read transaction so all three tables come from the same snapshot (taken at the first SELECT).
+    # Deferred: the migration only reads, so it must not hold the write lock against local writers.
+    conn.execute("BEGIN DEFERRED")
     
-    # 3. Migrate Items
-    print("\nMigrating Items...")
-    cursor.execute("SELECT item_id, json_data, updated_at FROM items")
-    items = cursor.fetchall()
-    for item in tqdm(items):
-        item_id, json_data, updated_at = item
-        try:
-            # Direct insert to bypass checks/overhead
-            query = '''
-                INSERT INTO items (item_id, json_data, updated_at)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (item_id) DO UPDATE SET
-                    json_data = EXCLUDED.json_data,
-                    updated_at = EXCLUDED.updated_at;
-            '''
-            cloud_db.cursor.execute(query, (item_id, json_data, updated_at))
-        except Exception as e:
-            print(f"Failed to migrate item {item_id}: {e}")
-    cloud_db.conn.commit()
-    
-    # 4. Migrate Inventory
-    print("\nMigrating Inventory Lists...")
-    cursor.execute("SELECT set_id, json_data, updated_at FROM inventory_lists")
-    invs = cursor.fetchall()
-    for inv in tqdm(invs):
-        set_id, json_data, updated_at = inv
-        try:
-            query = '''
-                INSERT INTO inventory_lists (set_id, json_data, updated_at)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (set_id) DO UPDATE SET
-                    json_data = EXCLUDED.json_data,
-                    updated_at = EXCLUDED.updated_at;
-            '''
-            cloud_db.cursor.execute(query, (set_id, json_data, updated_at))
-        except Exception as e:
-            print(f"Failed to migrate inventory {set_id}: {e}")
-    cloud_db.conn.commit()
-
-    # 5. Migrate Collections
-    print("\nMigrating Collections...")
-    cursor.execute("SELECT item_id, collection_name, added_at FROM collections")
-    cols = cursor.fetchall()
-    for col in tqdm(cols):
-        item_id, col_name, added_at = col
-        try:
-            query = '''
-                INSERT INTO collections (item_id, collection_name, added_at)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (item_id, collection_name) DO NOTHING;
-            '''
-            cloud_db.cursor.execute(query, (item_id, col_name, added_at))
-        except Exception as e:
-            print(f"Failed to migrate collection {item_id}: {e}")
-    cloud_db.conn.commit()
-    
+    # Index maintenance per row dominates bulk loads; drop now (outside the load), build once at the end
+    index_defs = drop_secondary_indexes(cloud_db, ("items", "inventory_lists", "collections"))
+
+    # Everything else goes through one transaction; durability is re-established at COMMIT
+    cloud_db.cursor.execute("SET LOCAL synchronous_commit = off")
+
+    try:
+        # 3. Migrate Items
+        print("\nMigrating Items...")
+        cursor.execute("SELECT item_id, json_data, updated_at FROM items")
+        count = copy_upsert(cloud_db.cursor, "items", ("item_id", "json_data", "updated_at"), cursor, '''
+            ON CONFLICT (item_id) DO UPDATE SET
+                json_data = EXCLUDED.json_data,
+                updated_at = EXCLUDED.updated_at
+        ''')
+        print(f"Copied {count} items.")
+
+        # 4. Migrate Inventory
+        print("\nMigrating Inventory Lists...")
+        cursor.execute("SELECT set_id, json_data, updated_at FROM inventory_lists")
+        count = copy_upsert(cloud_db.cursor, "inventory_lists", ("set_id", "json_data", "updated_at"), cursor, '''
+            ON CONFLICT (set_id) DO UPDATE SET
+                json_data = EXCLUDED.json_data,
+                updated_at = EXCLUDED.updated_at
+        ''')
+        print(f"Copied {count} inventory lists.")
+
+        # 5. Migrate Collections
+        print("\nMigrating Collections...")
+        cursor.execute("SELECT item_id, collection_name, added_at FROM collections")
+        count = copy_upsert(cloud_db.cursor, "collections", ("item_id", "collection_name", "added_at"), cursor,
+            "ON CONFLICT (item_id, collection_name) DO NOTHING")
+        print(f"Copied {count} collection entries.")
+
+        cloud_db.conn.commit()
+    except Exception as e:
+        cloud_db.conn.rollback()
+        print(f"Migration failed, nothing was written: {e}")
+        # The drops were committed on their own, so the indexes come back either way
+        print(f"\nRebuilding {len(index_defs)} indexes...")
+        rebuild_indexes(cloud_db, index_defs)
+        conn.rollback()
+        conn.close()
+        cloud_db.close()
+        return
+
+    print(f"\nRebuilding {len(index_defs)} indexes...")
+    rebuild_indexes(cloud_db, index_defs)
+
     print("\nMigration Complete!")
+    conn.commit()
     conn.close()
     cloud_db.close()
 
@@ -1,7 +1,7 @@
 import time
 import logging
 import sys
-from datetime import datetime
+from tqdm import tqdm
 from scraper import BrickLinkScraper
 from database import Database
 
@@ -29,29 +29,15 @@ def main():
     
     start_time = time.time()
     
+    # Preload the fresh (< 30 days old) IDs for the whole range in one query
+    ids = list(map("sh{:03d}".format, range(START, END + 1)))
+    fresh_ids = db.get_fresh_item_ids(ids)
+    
     try:
-        for i, num in enumerate(range(START, END + 1)):
-            item_id = f"sh{num:03d}"
-            
-            # Progress marker
-            progress = (i + 1) / total * 100
-            sys.stdout.write(f"\r[{progress:.1f}%] Checking {item_id}... ")
-            sys.stdout.flush()
-            
-            # 1. Check DB
-            cached_item = db.get_item(item_id)
-            use_cache = False
-            
-            if cached_item and "error" not in cached_item:
-                last_updated = cached_item.get("meta", {}).get("timestamp") or cached_item.get("meta", {}).get("cache_date")
-                if last_updated:
-                    try:
-                        last_date = datetime.fromisoformat(last_updated.split('T')[0])
-                        days_diff = (datetime.now() - last_date).days
-                        if days_diff < 30:
-                            use_cache = True
-                    except:
-                        use_cache = True
+        # tqdm throttles redraws, so the terminal isn't written on every item
+        for item_id in tqdm(ids, desc="Checking"):
+            # 1. Check preloaded freshness
+            use_cache = item_id in fresh_ids
 
             if use_cache:
                 cached += 1
@@ -63,13 +49,13 @@ def main():
                     data = scraper.scrape(item_id, item_type='M', force=False)
                     if "error" in data:
                         errors += 1
-                        sys.stdout.write("❌ Not Found\n")
+                        tqdm.write(f"❌ Not Found: {item_id}")
                     else:
                         scanned += 1
-                        print(f"\n✨ NEW DATA: {item_id} - {data.get('meta', {}).get('item_name', 'Unknown')}")
+                        tqdm.write(f"✨ NEW DATA: {item_id} - {data.get('meta', {}).get('item_name', 'Unknown')}")
                 except Exception as e:
                     errors += 1
-                    print(f"\n❌ Error {item_id}: {e}")
+                    tqdm.write(f"❌ Error {item_id}: {e}")
 
     except KeyboardInterrupt:
         print("\n\n🛑 Scan paused by user.")
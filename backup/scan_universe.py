@@ -1,8 +1,9 @@
+import asyncio
 import time
 import logging
 import sys
 import random
-from datetime import datetime
+from tqdm import tqdm
 from scraper import BrickLinkScraper
 from database import Database
 
@@ -12,6 +13,39 @@ if sys.platform == 'win32':
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 
+CONCURRENCY = 8  # Parallel browser sessions; kept low to stay polite to BrickLink
+
+async def scan_year(year, ids, scrapers):
+    """Scrapes IDs concurrently, one in-flight request per scraper. Returns (scanned, errors)."""
+    # Each scraper owns its own browser and DB cursor, so a queue of scrapers bounds concurrency
+    pool = asyncio.Queue()
+    for s in scrapers:
+        pool.put_nowait(s)
+    
+    scanned = errors = 0
+    progress = tqdm(total=len(ids), desc=f"   [{year}]")
+    
+    async def scrape_one(item_id):
+        nonlocal scanned, errors
+        scraper = await pool.get()
+        try:
+            data = await asyncio.to_thread(scraper.scrape, item_id, 'M', False)
+            if "error" in data:
+                errors += 1
+            else:
+                scanned += 1
+        except Exception:
+            errors += 1
+        finally:
+            pool.put_nowait(scraper)
+            progress.update(1)
+    
+    try:
+        await asyncio.gather(*(scrape_one(item_id) for item_id in ids))
+    finally:
+        progress.close()
+    return scanned, errors
+
 def main():
     print("🌍 STARTING UNIVERSAL LEGO SCANNER (2005 - 2026)")
     print("==================================================")
@@ -19,6 +53,7 @@ def main():
     
     db = Database()
     scraper = BrickLinkScraper()
+    scrapers = [scraper] + [BrickLinkScraper() for _ in range(CONCURRENCY - 1)]
     
     START_YEAR = 2005
     END_YEAR = 2026
@@ -43,48 +78,27 @@ def main():
             total_items = len(ids)
             print(f"   🔍 Found {total_items} items to scan.")
             
-            # Step 2: Scan IDs
-            year_scanned = 0
+            # Step 2: Split cached vs stale IDs
             year_cached = 0
+            to_scrape = []
             
-            for i, item_id in enumerate(ids):
-                # Progress
-                progress = (i + 1) / total_items * 100
-                sys.stdout.write(f"\r   [{year}] Item {i+1}/{total_items} ({progress:.1f}%) | {item_id}...")
-                sys.stdout.flush()
-                
-                # Check DB first
-                cached_item = db.get_item(item_id)
-                use_cache = False
-                
-                if cached_item and "error" not in cached_item:
-                    last_updated = cached_item.get("meta", {}).get("timestamp") or cached_item.get("meta", {}).get("cache_date")
-                    if last_updated:
-                        try:
-                            last_date = datetime.fromisoformat(last_updated.split('T')[0])
-                            days_diff = (datetime.now() - last_date).days
-                            if days_diff < 30:
-                                use_cache = True
-                        except:
-                            use_cache = True
+            # Preload the fresh (< 30 days old) IDs for the whole year in one query
+            fresh_ids = db.get_fresh_item_ids(ids)
+            
+            for item_id in ids:
+                use_cache = item_id in fresh_ids
 
                 if use_cache:
                     year_cached += 1
-                    grand_total_cached += 1
                 else:
-                    try:
-                        # Scan
-                        data = scraper.scrape(item_id, item_type='M', force=False)
-                        if "error" in data:
-                            grand_total_errors += 1
-                        else:
-                            year_scanned += 1
-                            grand_total_scanned += 1
-                            # Optional: Print cool find
-                            # name = data.get('meta', {}).get('item_name', 'Unknown')
-                            # print(f"\n      ✨ Found: {name}")
-                    except Exception as e:
-                        grand_total_errors += 1
+                    to_scrape.append(item_id)
+            
+            grand_total_cached += year_cached
+            
+            # Step 3: Scrape stale IDs concurrently
+            year_scanned, year_errors = asyncio.run(scan_year(year, to_scrape, scrapers))
+            grand_total_scanned += year_scanned
+            grand_total_errors += year_errors
             
             print(f"\n   ✅ Year {year} Complete: {year_scanned} New | {year_cached} Cached")
             
@@ -95,6 +109,8 @@ def main():
         print("\n\n🛑 Scan paused by user.")
         
     finally:
+        for s in scrapers:
+            s.close()
         db.close()
         print(f"\n==================================================")
         print(f"🏁 UNIVERSAL SCAN STOPPED")
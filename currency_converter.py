@@ -1,8 +1,16 @@
+import numpy as np
 import requests
-import streamlit as st
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import threading
+import time
 import logging
 
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
 # Fallback rates if API fails
 FALLBACK_RATES = {
     'ILS': 1.00,
@@ -13,45 +21,64 @@ FALLBACK_RATES = {
     'AUD': 2.35
 }
 
+RATES_TTL_SECONDS = 86400  # 24 hours
+
+# Process-level cache shared by every Streamlit session
+_RATES_CACHE = {"rates": None, "ts": 0.0}
+_LOCK = threading.Lock()
+
+# Rates laid out as a flat array for vectorized conversion (codes sorted for searchsorted).
+# The extra trailing slot holds the 1.0 rate used for unknown codes.
+_CODES = np.array(sorted(FALLBACK_RATES))
+_RATES_ARR = {"rates": None, "arr": None}
+
+RATES_URL = 'https://api.exchangerate-api.com/v4/latest/USD'
+RATES_TIMEOUT = (2, 5)  # (connect, read) seconds
+
+# Keep-alive session so refreshes reuse the TCP/TLS connection
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=1,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+))
+
 class CurrencyConverter:
     """
-    Singleton Currency Converter with session state caching.
+    Singleton Currency Converter with a process-level cache.
     Fetches live rates from exchangerate-api.com (free tier: 1,500 requests/month).
-    Caches rates for 24 hours to prevent quota burn.
+    Caches rates for 24 hours (shared across sessions) to prevent quota burn.
     """
     
     @staticmethod
     def get_rates():
         """
-        Gets currency rates (cached in session state).
+        Gets currency rates (cached per process).
         Only makes API call once per 24 hours.
         """
-        # Initialize session state if needed
-        if 'currency_rates' not in st.session_state:
-            st.session_state.currency_rates = None
-            st.session_state.currency_rates_timestamp = None
-        
-        # Check if cache is valid (24 hours)
-        now = datetime.now()
-        cache_valid = False
-        
-        if st.session_state.currency_rates and st.session_state.currency_rates_timestamp:
-            age = (now - st.session_state.currency_rates_timestamp).total_seconds()
-            cache_valid = age < 86400  # 24 hours in seconds
-        
-        # Return cached rates if valid
-        if cache_valid:
-            return st.session_state.currency_rates
+        rates = _RATES_CACHE["rates"]
+        if rates and time.monotonic() - _RATES_CACHE["ts"] < RATES_TTL_SECONDS:
+            return rates
         
-        # Fetch fresh rates from API
+        with _LOCK:
+            # Another session may have refreshed while we waited for the lock
+            now = time.monotonic()
+            if _RATES_CACHE["rates"] and now - _RATES_CACHE["ts"] < RATES_TTL_SECONDS:
+                return _RATES_CACHE["rates"]
+            
+            rates = CurrencyConverter._fetch_rates()
+            _RATES_CACHE["rates"] = rates
+            _RATES_CACHE["ts"] = now
+            return rates
+    
+    @staticmethod
+    def _fetch_rates():
+        """Fetches fresh rates from the API, falling back to static rates on failure."""
         try:
             logging.info("Fetching live currency rates from API...")
-            response = requests.get(
-                'https://api.exchangerate-api.com/v4/latest/USD',
-                timeout=5
-            )
+            response = _SESSION.get(RATES_URL, timeout=RATES_TIMEOUT)
             response.raise_for_status()
-            data = response.json()
+            data = _json.loads(response.content)
             
             # Convert to ILS-based rates (API gives USD-based)
             usd_to_ils = data['rates'].get('ILS', 3.60)
@@ -65,20 +92,11 @@ class CurrencyConverter:
                 'AUD': data['rates'].get('AUD', 1.52) * usd_to_ils
             }
             
-            # Cache the rates
-            st.session_state.currency_rates = rates
-            st.session_state.currency_rates_timestamp = now
-            
             logging.info(f"✅ Live rates fetched: USD={rates['USD']:.2f} ILS")
             return rates
             
         except Exception as e:
             logging.warning(f"⚠️ Currency API failed: {e}. Using fallback rates.")
-            
-            # Use fallback rates and cache them
-            st.session_state.currency_rates = FALLBACK_RATES
-            st.session_state.currency_rates_timestamp = now
-            
             return FALLBACK_RATES
     
     @staticmethod
@@ -92,3 +110,23 @@ class CurrencyConverter:
         """Converts an amount from any currency to ILS."""
         rate = CurrencyConverter.get_rate(currency_code)
         return round(amount * rate, 2)
+    
+    @staticmethod
+    def _get_rates_array():
+        """Returns the rates aligned to _CODES, rebuilt only when the rates dict refreshes."""
+        rates = CurrencyConverter.get_rates()
+        if _RATES_ARR["rates"] is not rates:
+            _RATES_ARR["arr"] = np.array([rates.get(code, 1.0) for code in _CODES] + [1.0])
+            _RATES_ARR["rates"] = rates
+        return _RATES_ARR["arr"]
+    
+    @staticmethod
+    def convert_series_to_ils(amounts, currency_codes):
+        """Converts arrays of amounts and currency codes to ILS in a single vectorized pass."""
+        amounts = np.asarray(amounts, dtype=float)
+        codes = np.char.upper(np.asarray(currency_codes).astype(str))
+        
+        idx = np.minimum(np.searchsorted(_CODES, codes), len(_CODES) - 1)
+        idx = np.where(_CODES[idx] == codes, idx, len(_CODES))  # Unknown codes -> 1.0 slot
+        
+        return np.round(amounts * np.take(CurrencyConverter._get_rates_array(), idx), 2)
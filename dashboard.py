@@ -1,20 +1,31 @@
 import streamlit as st
 import pandas as pd
-import json
-import sqlite3
+import numpy as np
+try:
+    from orjson import loads as json_loads  # C parser; the stdlib one is the fallback
+except ImportError:
+    from json import loads as json_loads
+import io
 import os
+import html
+import re
 import time
 import logging
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from database import Database
 from pricing_engine import PriceAnalyzer
-from scraper import BrickLinkScraper
+from item_ids import JUNK_PATTERN, FIG_PATTERN, is_junk_id, is_fig_id
 
 # --- CONFIGURATION ---
 st.set_page_config(page_title="BrickLink Sniper V1.3", layout="wide", page_icon="🧱")
 
 # --- CUSTOM CSS ---
+# (the preconnect warms up the TLS connection to the image CDN before the first gallery renders)
 st.markdown("""
+<link rel="preconnect" href="https://img.bricklink.com">
 <style>
     .stChatInputContainer {bottom: 20px;}
     .stMetric {background-color: transparent; padding: 10px; border-radius: 5px; border: 1px solid #333;}
@@ -142,41 +153,200 @@ if st.sidebar.button("🔄 Switch Mode"):
 st.sidebar.divider()
 
 # --- HELPER FUNCTIONS ---
-def get_scraper():
-    return BrickLinkScraper()
+def get_db():
+    """Per-session Database, reused across reruns instead of reconnecting for every action."""
+    from database import Database  # Deferred: the login / About Me screens never touch the DB
+    db = st.session_state.get("db")
+    if db is not None and not db.conn.closed:
+        try:
+            db.conn.rollback()  # End any read transaction left open by the previous action
+            return db
+        except Exception:
+            pass  # Connection dropped server-side; reconnect below
+    db = st.session_state.db = Database()
+    return db
+
+def release_db():
+    """
+    Ends the session connection's open read transaction once a run is done, so an idle tab
+    doesn't sit "idle in transaction" holding locks that block schema changes.
+    """
+    db = st.session_state.get("db")
+    if db is not None and not db.conn.closed:
+        try:
+            db.conn.rollback()
+        except Exception:
+            pass  # Connection dropped server-side; get_db reconnects on the next action
+
+MAX_BROWSERS = 8  # Headless Chromes alive at once, across all sessions, batch workers and fig workers
+
+class ScraperPool:
+    """
+    Process-wide set of scrapers, each lent to one caller at a time for a single scrape.
+    Drivers are started on demand and kept for reuse (across items, reruns and sessions), and
+    no more than `size` exist at once; callers beyond that wait for one to be handed back.
+    Nothing holds a scraper while waiting for another, so nested fan-out can't deadlock.
+    """
+
+    def __init__(self, size):
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def scraper(self):
+        self._slots.acquire()
+        try:
+            with self._lock:
+                scraper = self._idle.pop() if self._idle else None
+            if scraper is None:
+                from scraper import BrickLinkScraper  # Deferred: Selenium + bs4 are only needed once a scrape runs
+                scraper = BrickLinkScraper()
+            try:
+                yield scraper
+            except Exception:
+                _close_scraper(scraper)  # Its driver may be in a bad state; don't lend it out again
+                raise
+            with self._lock:
+                self._idle.append(scraper)
+        finally:
+            self._slots.release()
+
+    def close_idle(self):
+        """Quits every driver not currently lent out; the next scrape starts a fresh one."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for scraper in idle:
+            _close_scraper(scraper)
+
+def _close_scraper(scraper):
+    try:
+        scraper.close()
+    except Exception:
+        pass  # Driver already gone (e.g. Chrome crashed)
+
+@st.cache_resource
+def get_scraper_pool():
+    """The one ScraperPool of this server process (cache_resource: shared by every session and thread)."""
+    return ScraperPool(MAX_BROWSERS)
+
+def reset_scraper():
+    """Quits the pooled drivers not in use; scrapes still running keep theirs."""
+    get_scraper_pool().close_idle()
 
 
 
+# Set Analyzer chat input: IDs separated by commas/whitespace, plus an optional force flag
+_TOKEN_SPLIT = re.compile(r"[,\s]+")
+_FORCE_FLAGS = frozenset({"force", "--force", "-f"})
+
+@lru_cache(maxsize=8192)  # Same IDs recur across galleries, reports and reruns
 def get_img_url(item_id):
     item_id = str(item_id).strip()
-    is_fig = any(c.isalpha() for c in item_id)
-    if is_fig:
+    if is_fig_id(item_id):
         return f"https://img.bricklink.com/ItemImage/MN/0/{item_id}.png"
     else:
         img_id = item_id if "-" in item_id else f"{item_id}-1"
         return f"https://img.bricklink.com/ItemImage/SN/0/{img_id}.png"
 
-def render_gallery_html(images, captions):
+MAX_CHAT_MESSAGES = 20  # History is replayed on every rerun, so keep it bounded
+MAX_ARCHIVED_MESSAGES = 100  # Older messages, only rendered after "Load older messages"
+MAX_HISTORY_BATCH_ROWS = 50
+
+# Batch summary columns (process_analysis "summary" keys) and their dtypes
+SUMMARY_SCHEMA = {
+    "ID": object,
+    "Name": object,
+    "New Price": "f8",
+    "Used Price": "f8",
+    "Profit": "f8",
+    "Rating": object,
+    "Status": object
+}
+SUMMARY_NUMERIC_COLS = [k for k, dt in SUMMARY_SCHEMA.items() if dt == "f8"]  # Summed into the totals row
+
+def append_message(msg):
+    """
+    Appends to the chat history. Entries beyond MAX_CHAT_MESSAGES move to the archive,
+    which keeps the newest MAX_ARCHIVED_MESSAGES of them.
+    """
+    messages = st.session_state.messages
+    messages.append(msg)
+    if len(messages) > MAX_CHAT_MESSAGES:
+        archive = st.session_state.setdefault("archive", [])
+        archive.extend(messages[:-MAX_CHAT_MESSAGES])
+        del messages[:-MAX_CHAT_MESSAGES]
+        del archive[:-MAX_ARCHIVED_MESSAGES]
+
+def render_message(msg):
+    """Replays one chat history entry."""
+    with st.chat_message(msg["role"]):
+        if "rendered_html" in msg:
+            st.markdown(msg["rendered_html"], unsafe_allow_html=True)
+            return
+
+        # Render Expanders for Batch items
+        if "expanders" in msg:
+            for item in msg["expanders"]:
+                with st.expander(f"📄 Report: {item['id']} - {item['name']}"):
+                    st.markdown(item['html'], unsafe_allow_html=True)
+
+        # If batch summary DF exists, show it (AT THE END)
+        if "batch_df" in msg:
+            st.dataframe(msg["batch_df"], width="stretch", hide_index=True)
+
+        # Standard Single Item Render
+        if "image_url" in msg and msg["image_url"]:
+            st.image(msg["image_url"], width=200)
+        
+        if msg.get("type") == "code":
+            st.code(msg["content"], language="text")
+        
+        if msg.get("content") and msg.get("type") != "code":
+            st.write(msg["content"])
+            
+        if "gallery_html" in msg:
+            st.markdown("### 👥 Minifigures Gallery")
+            render_gallery_html(msg["gallery_html"])
+
+_GALLERY_OPEN = '<div style="display: flex; flex-wrap: wrap; gap: 15px; margin-top: 10px; justify-content: center; width: 100%;">'
+_GALLERY_TILE = """<div style="display: flex; flex-direction: column; align-items: center; width: 110px;"><div style="height: 110px; display: flex; align-items: center; justify-content: center; overflow: hidden; background: #f9f9f9; border-radius: 8px; border: 1px solid #eee;"><img src="{img}" loading="lazy" decoding="async" width="100" height="100" style="max-width: 100%; max-height: 100%; object-fit: contain;"></div><div style="font-size: 12px; text-align: center; margin-top: 5px; color: #555; line-height: 1.2;">{cap}</div></div>"""
+
+def gallery_html(images, captions):
     """
-    Renders a responsive, aligned gallery using HTML/CSS because st.image 
+    Builds a responsive, aligned gallery using HTML/CSS because st.image 
     doesn't support fixed height/aspect-ratio control well.
     """
-    html = '<div style="display: flex; flex-wrap: wrap; gap: 15px; margin-top: 10px; justify-content: center; width: 100%;">'
-    
-    for img, cap in zip(images, captions):
-        caption_html = cap.replace('\n', '<br>')
-        html += f"""<div style="display: flex; flex-direction: column; align-items: center; width: 110px;"><div style="height: 110px; display: flex; align-items: center; justify-content: center; overflow: hidden; background: #f9f9f9; border-radius: 8px; border: 1px solid #eee;"><img src="{img}" style="max-width: 100%; max-height: 100%; object-fit: contain;"></div><div style="font-size: 12px; text-align: center; margin-top: 5px; color: #555; line-height: 1.2;">{caption_html}</div></div>"""
-    
-    html += "</div>"
+    parts = [_GALLERY_OPEN]
+    parts.extend(_GALLERY_TILE.format(img=img, cap=cap.replace('\n', '<br>')) for img, cap in zip(images, captions))
+    parts.append("</div>")
+    return "".join(parts)
+
+def main_image_html(url):
+    """Set/minifig picture as inline HTML (sized to its column) instead of a separate st.image element."""
+    return f'<img src="{url}" loading="lazy" decoding="async" width="350" height="350" style="width: 100%; height: auto; max-width: 350px; object-fit: contain;">'
+
+def render_gallery_html(markup):
+    st.markdown(markup, unsafe_allow_html=True)
 
-    st.markdown(html, unsafe_allow_html=True)
+_REPORT_MESSAGE = """<div style="display: flex; flex-wrap: wrap; gap: 1rem; align-items: flex-start;"><div style="flex: 1 1 200px; max-width: 350px;">{img}</div><pre style="flex: 2 1 400px; margin: 0; padding: 1rem; overflow-x: auto; background: rgba(128, 128, 128, 0.08); border-radius: 0.5rem; font-size: 14px;">{report}</pre></div>"""
+
+def report_message_html(main_img, report, gallery):
+    """
+    Item report (picture, report, figs gallery) as one HTML blob, so a chat answer or batch
+    expander costs one st.markdown on replay instead of columns + st.image + st.code.
+    """
+    parts = [_REPORT_MESSAGE.format(img=main_image_html(main_img), report=html.escape(report))]
+    if gallery:
+        parts.append('<h3>👥 Minifigures Gallery</h3>' + gallery)
+    return "".join(parts)
 
 
 
 def delete_from_db(item_id):
     """Deletes an item from the database."""
     item_id = str(item_id).strip()
-    db = Database()
+    db = get_db()
     try:
         # PostgreSQL uses %s, not ?
         db.cursor.execute("DELETE FROM items WHERE item_id = %s", (item_id,))
@@ -184,11 +354,13 @@ def delete_from_db(item_id):
         
         db.cursor.execute("DELETE FROM inventory_lists WHERE set_id = %s", (item_id,))
         
-        # Remove from collections (Ram's and Udi's) - Best effort
-        db.remove_from_collection(item_id, "Ram's Collection") 
-        db.remove_from_collection(item_id, "Udi's Collection")
+        # Remove from collections (Ram's and Udi's) in the same transaction
+        db.cursor.execute("DELETE FROM collections WHERE item_id = %s AND collection_name = ANY(%s)",
+                          (item_id, ["Ram's Collection", "Udi's Collection"]))
         
-        db.conn.commit()
+        db.conn.commit()  # Single commit for all three deletes
+        load_data.clear()
+        _cached_analysis.clear()
         
         if deleted_items > 0:
             st.toast(f"Deleted {item_id} (and associated data)", icon="🗑️")
@@ -196,100 +368,165 @@ def delete_from_db(item_id):
             st.toast(f"Item {item_id} not found in main DB", icon="⚠️")
             
     except Exception as e:
+        db.conn.rollback()
         st.error(f"Delete failed: {e}")
-    finally:
-        db.close()
+
+@st.fragment
+def render_delete_actions(delete_key=None, input_key=None):
+    """
+    Sidebar delete action. Runs as a fragment (call it inside `with st.sidebar:`),
+    so typing an ID only reruns this block; the full page reruns after an actual delete.
+    """
+    st.subheader("Actions")
+    del_id = st.text_input("Delete Item ID", key=input_key)
+    if st.button("Delete Item", key=delete_key):
+        if del_id:
+            delete_from_db(del_id)  # Clears the caches that depend on the deleted item
+            st.rerun(scope="app")
+
+# Console report templates (layout matches runner.py); format specs are parsed from these constants
+_REPORT_RULE = "=" * 70
+_REPORT_DASH = "-" * 70
+_REPORT_HEADER = _REPORT_RULE + "\nBRICKLINK REPORT: {item_id} - {name}\nLast Updated: {updated}\n" + _REPORT_RULE
+_REPORT_CONDITION = (
+    "\n\n--- {cond} ---"
+    "\nMarket Price   : {market_price:.2f} ILS"
+    "\nTypical Range  : {low:.2f} - {high:.2f} ILS"
+    "\nConfidence     : {confidence}"
+    "\nData Integrity : {sold} Sales | {stock} Listings"
+)
+_REPORT_INVESTMENT = (
+    "\n\n" + _REPORT_DASH + "\n🔍 STEP 2: INVESTMENT ANALYSIS\n" + _REPORT_DASH
+    + "\n📅 STATUS: {status} (Released: {year})"
+)
+_REPORT_SNIPER = "\n\n🎯 SNIPER OPPORTUNITY (New)\n   Deal Rating      : {rating}"
+_REPORT_SNIPER_DEAL = (
+    "\n   Cheapest Listing : {price:.2f} ILS"
+    "\n   Potential Profit : {profit:.2f} ILS (Margin: {margin}%)"
+)
+_REPORT_FIGS_HEADER = (
+    "\n\n" + _REPORT_DASH + "\n👥 STEP 3: MINIFIGURE BREAKDOWN\n" + _REPORT_DASH
+    + "\n   ✅ Found {count} minifigures."
+    # Match runner.py column widths: ID<10 Name<35 Qty<5 New<12 Used<12
+    + f"\n   {'ID':<10} {'Name':<35} {'Qty':<5} {'New (ea)':<12} {'Used (ea)':<12}"
+    + f"\n   {'-'*10} {'-'*35} {'-'*5} {'-'*12} {'-'*12}"
+)
+_REPORT_FIG_ROW = "\n   {id:<10} {name:<35} {qty:<5} {new:<12.2f} {used:<12.2f}"
+_REPORT_COMPARISON = (
+    "\n\n" + _REPORT_DASH + "\n📊 COMPARISON (Set vs Minifigs)\n" + _REPORT_DASH
+    + f"\n   {'Metric':<15} {'NEW':<15} {'USED':<15}"
+    + "\n   " + "-" * 45
+    + f"\n   {'Set Price':<15} " + "{set_new:<15.2f} {set_used:<15.2f}"
+    + f"\n   {'Figs Sum':<15} " + "{figs_new:<15.2f} {figs_used:<15.2f}"
+    + f"\n   {'Figs % of Set':<15} " + "{pct_new:<14.1f}% {pct_used:<14.1f}%"
+)
+_REPORT_PART_OUT = "\n   🔥 NEW: Strong Part-Out Candidate! (Figs > 80% of Set Price)"
+_REPORT_FOOTER = "\n\n" + _REPORT_RULE
 
 def create_console_report(item_id, result, minifig_details, mf_new, mf_used):
     """Generates an ASCII-style report EXACTLY matching runner.py output."""
-    lines = []
+    buf = io.StringIO()
+    write = buf.write
     meta = result['meta']
     
     # Header
-    lines.append("="*70)
-    lines.append(f"BRICKLINK REPORT: {item_id} - {meta.get('item_name', 'Unknown')}")
-    lines.append(f"Last Updated: {meta.get('cache_date', 'Fresh Fetch')}")
-    lines.append("="*70)
+    write(_REPORT_HEADER.format(item_id=item_id, name=meta.get('item_name', 'Unknown'),
+                                updated=meta.get('cache_date', 'Fresh Fetch')))
     
     # 1. Prices
     for cond in ['new', 'used']:
         r = result[cond]
-        lines.append(f"\n--- {cond.upper()} ---")
-        lines.append(f"Market Price   : {r['market_price']:.2f} ILS")
-        lines.append(f"Typical Range  : {r['range'][0]:.2f} - {r['range'][1]:.2f} ILS")
-        lines.append(f"Confidence     : {r['confidence']}")
-        lines.append(f"Data Integrity : {r['stats']['sold']['final_count']} Sales | {r['stats']['stock']['final_count']} Listings")
+        write(_REPORT_CONDITION.format(
+            cond=cond.upper(), market_price=r['market_price'], low=r['range'][0], high=r['range'][1],
+            confidence=r['confidence'], sold=r['stats']['sold']['final_count'], stock=r['stats']['stock']['final_count']
+        ))
 
     # 2. Investment Analysis
     deep = result.get('deep_dive', {})
-    lines.append(f"\n{'-'*70}")
-    lines.append("🔍 STEP 2: INVESTMENT ANALYSIS")
-    lines.append(f"{'-'*70}")
-    status = deep.get('lifecycle', {}).get('status', 'N/A')
-    lines.append(f"📅 STATUS: {status} (Released: {meta.get('year_released', 'N/A')})")
+    write(_REPORT_INVESTMENT.format(status=deep.get('lifecycle', {}).get('status', 'N/A'),
+                                    year=meta.get('year_released', 'N/A')))
     
     sniper = deep.get('sniper', {})
     if sniper:
-        lines.append(f"\n🎯 SNIPER OPPORTUNITY (New)")
         rating = sniper.get('rating', 'N/A')
+        write(_REPORT_SNIPER.format(rating=rating))
         if "NO LISTINGS" not in rating:
-            lines.append(f"   Deal Rating      : {rating}")
-            lines.append(f"   Cheapest Listing : {sniper.get('price', 0):.2f} ILS")
-            lines.append(f"   Potential Profit : {sniper.get('profit_abs', 0):.2f} ILS (Margin: {sniper.get('margin_pct', 0)}%)")
-        else:
-             lines.append(f"   Deal Rating      : {rating}")
+            write(_REPORT_SNIPER_DEAL.format(price=sniper.get('price', 0), profit=sniper.get('profit_abs', 0),
+                                             margin=sniper.get('margin_pct', 0)))
 
     # 3. Minifigure Breakdown
     if minifig_details:
-        lines.append(f"\n{'-'*70}")
-        lines.append("👥 STEP 3: MINIFIGURE BREAKDOWN")
-        lines.append(f"{'-'*70}")
-        lines.append(f"   ✅ Found {len(minifig_details)} minifigures.")
-        
-        # Match runner.py column widths: ID<10 Name<35 Qty<5 New<12 Used<12
-        lines.append(f"   {'ID':<10} {'Name':<35} {'Qty':<5} {'New (ea)':<12} {'Used (ea)':<12}")
-        lines.append(f"   {'-'*10} {'-'*35} {'-'*5} {'-'*12} {'-'*12}")
+        write(_REPORT_FIGS_HEADER.format(count=len(minifig_details)))
         
         for m in minifig_details:
             # Name truncation logic
             name_short = (m['name'][:33] + '..') if len(m['name']) > 35 else m['name']
-            lines.append(f"   {m['id']:<10} {name_short:<35} {m['qty']:<5} {m['new']:<12.2f} {m['used']:<12.2f}")
+            write(_REPORT_FIG_ROW.format(id=m['id'], name=name_short, qty=m['qty'], new=m['new'], used=m['used']))
             
         # Comparison Section
-        lines.append(f"\n{'-'*70}")
-        lines.append(f"📊 COMPARISON (Set vs Minifigs)")
-        lines.append(f"{'-'*70}")
-        
         set_price_new = result['new']['market_price']
         set_price_used = result['used']['market_price']
         
         pct_new = (mf_new / set_price_new * 100) if set_price_new > 0 else 0
         pct_used = (mf_used / set_price_used * 100) if set_price_used > 0 else 0
         
-        lines.append(f"   {'Metric':<15} {'NEW':<15} {'USED':<15}")
-        lines.append(f"   {'-'*45}")
-        lines.append(f"   {'Set Price':<15} {set_price_new:<15.2f} {set_price_used:<15.2f}")
-        lines.append(f"   {'Figs Sum':<15} {mf_new:<15.2f} {mf_used:<15.2f}")
-        lines.append(f"   {'Figs % of Set':<15} {pct_new:<14.1f}% {pct_used:<14.1f}%")
+        write(_REPORT_COMPARISON.format(set_new=set_price_new, set_used=set_price_used, figs_new=mf_new,
+                                        figs_used=mf_used, pct_new=pct_new, pct_used=pct_used))
         
         if pct_new > 80:
-            lines.append(f"   🔥 NEW: Strong Part-Out Candidate! (Figs > 80% of Set Price)")
+            write(_REPORT_PART_OUT)
         
-    lines.append(f"\n{'='*70}")
-    return "\n".join(lines)
+    write(_REPORT_FOOTER)
+    return buf.getvalue()
 
 
 
-def process_analysis(item_id, deep_scan_enabled, force_scrape=False, progress_callback=None):
+FIG_SCRAPE_WORKERS = 8
+BATCH_WORKERS = 4  # Every scrape, batch or fig, borrows from the same pool, so browsers stay <= MAX_BROWSERS
+
+def scrape_figs_concurrently(fig_ids, progress_callback=None):
+    """
+    Scrapes minifigures in parallel (network-bound, so threads are enough).
+    Each scrape borrows a scraper from the shared pool, since a scraper owns a single browser.
+    Nothing is saved here: the caller analyzes the results once and persists them with save_items.
+    Returns {fig_id: scrape_result}.
+    """
+    pool = get_scraper_pool()
+
+    def scrape_one(fig_id):
+        with pool.scraper() as scraper:
+            return scraper.scrape(fig_id, item_type='M', save=False)  # Saved in one batch by the caller
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(FIG_SCRAPE_WORKERS, len(fig_ids))) as executor:
+        futures = {executor.submit(scrape_one, fig_id): fig_id for fig_id in fig_ids}
+        for done, future in enumerate(as_completed(futures), 1):
+            fig_id = futures[future]
+            try:
+                results[fig_id] = future.result()
+            except Exception as e:
+                logging.warning(f"Failed to scrape minifigure {fig_id}: {e}")
+            if progress_callback:
+                progress_callback(f"⬇️ Fetched {done}/{len(fig_ids)} minifigures...")
+    return results
+
+def process_analysis(item_id, deep_scan_enabled, force_scrape=False, progress_callback=None, db=None,
+                     items=None, inventories=None):
     """
     Core analysis logic shared by Batch and Single modes.
+    Uses the session Database unless `db` is given (worker threads pass their own).
+    A scraper is only borrowed from the pool once something actually has to be scraped, so a
+    fully cached analysis never starts a browser.
+    `items` / `inventories` are {id: data} dicts preloaded for a whole batch; the item and its
+    inventory are looked up there instead of with a query of their own.
     Returns a dict with results or error.
     """
     if progress_callback: progress_callback(f"🔎 Analyzing {item_id}...")
     
-    db = Database()
-    item_data = db.get_item(item_id)
+    db = db or get_db()
+    item_data = items.get(item_id) if items is not None else db.get_item(item_id)
     needs_scrape = False
+    stale_before = datetime.now() - timedelta(days=30)  # One clock read for the item and all its figs
     
     # 1. Validation Logic
     if force_scrape:
@@ -304,7 +541,7 @@ def process_analysis(item_id, deep_scan_enabled, force_scrape=False, progress_ca
             else:
                 last_update = datetime(2000, 1, 1)
 
-            if datetime.now() - last_update > timedelta(days=30):
+            if last_update < stale_before:
                 needs_scrape = True
 
         except: needs_scrape = True
@@ -320,22 +557,22 @@ def process_analysis(item_id, deep_scan_enabled, force_scrape=False, progress_ca
             except:
                 needs_scrape = True
 
-    scraper = get_scraper()
-    
     # 2. Scrape if needed
     if needs_scrape:
         try:
             if progress_callback: progress_callback(f"⏳ Scraping {item_id}...")
             
             # Determine type
-            itype = 'M' if any(c.isalpha() for c in item_id) else 'S'
+            itype = 'M' if is_fig_id(item_id) else 'S'
             
-            scrape_result = scraper.scrape(item_id, item_type=itype, force=True)
+            with get_scraper_pool().scraper() as scraper:
+                scrape_result = scraper.scrape(item_id, item_type=itype, force=True)
             if scrape_result and "error" in scrape_result:
                 return {"error": scrape_result["error"]}
             
             if scrape_result:
                 item_data = db.get_item(item_id) # Reload cleaned
+                load_data.clear()
         except Exception as e:
             return {"error": f"Scrape failed: {e}"}
 
@@ -349,25 +586,28 @@ def process_analysis(item_id, deep_scan_enabled, force_scrape=False, progress_ca
     mf_images = []
     mf_captions = []
 
-    if not any(c.isalpha() for c in item_id):
-        inv, _ = db.get_inventory(item_id)
+    if not is_fig_id(item_id):
+        inv = inventories.get(item_id) if inventories is not None else db.get_inventory(item_id)[0]
         if not inv:
             try: 
                 if progress_callback: progress_callback("🔎 Fetching inventory...")
-                inv = scraper.get_minifigs_in_set(item_id)
+                with get_scraper_pool().scraper() as scraper:
+                    inv = scraper.get_minifigs_in_set(item_id)
             except: pass
 
         if inv:
             num_figs = len(inv)
             if progress_callback: progress_callback(f"👥 Analyzing {num_figs} Minifigures...")
             
+            # Pass 1: load all cached fig data in one query and find stale/missing figs
+            fig_data = db.get_items([fig['id'] for fig in inv])
+            stale_fig_ids = []
             for idx, fig in enumerate(inv):
                 # Progress Update
                 if progress_callback: 
                     progress_callback(f"👥 Analyzing Minifigures... ({idx+1}/{num_figs}): {fig['name'][:20]}...")
 
-                # Get fig data
-                fd = db.get_item(fig['id'])
+                fd = fig_data.get(fig['id'])
                 
                 # Check for bad data or stale data
                 fig_needs_scrape = False
@@ -378,8 +618,7 @@ def process_analysis(item_id, deep_scan_enabled, force_scrape=False, progress_ca
                     last_updated = fd.get("meta", {}).get("timestamp") or fd.get("updated_at")
                     if last_updated:
                         try:
-                            dt = datetime.fromisoformat(last_updated)
-                            if datetime.now() - dt > timedelta(days=30):
+                            if datetime.fromisoformat(last_updated) < stale_before:
                                 fig_needs_scrape = True
                         except: fig_needs_scrape = True
 
@@ -392,26 +631,42 @@ def process_analysis(item_id, deep_scan_enabled, force_scrape=False, progress_ca
                                 fig_needs_scrape = True
                         except: fig_needs_scrape = True
                 
-                # Scrape if needed
                 if fig_needs_scrape:
-                    try:
-                        msg = f"⬇️ Fetching data for {fig['name'][:15]}... ({idx+1}/{num_figs})"
-                        if progress_callback: progress_callback(msg)
-                        else: st.toast(msg, icon="⬇️")
-                        
-                        fresh_data = scraper.scrape(fig['id'], item_type='M')
-                        if fresh_data:
-                            db.save_item(fig['id'], fresh_data)
-                            fd = db.get_item(fig['id']) # Reload immediately
-                    except Exception as e:
-                        print(f"Failed to fix {fig['id']}: {e}")
-
-                # Calculate
+                    stale_fig_ids.append(fig['id'])
+
+            # Pass 2: scrape all stale figs concurrently, persist on this thread
+            saved_analyses = {}
+            if stale_fig_ids:
+                msg = f"⬇️ Fetching data for {len(stale_fig_ids)} minifigures..."
+                if progress_callback: progress_callback(msg)
+                else: st.toast(msg, icon="⬇️")
+                
+                fresh = {fig_id: data for fig_id, data in scrape_figs_concurrently(stale_fig_ids, progress_callback).items()
+                         if data and "error" not in data}
+                # Analyze each fresh fig once: the result feeds both the saved summary and Pass 3
+                fresh_analyses = {}
+                for fig_id, data in fresh.items():
+                    try: fresh_analyses[fig_id] = PriceAnalyzer(data).analyze()
+                    except: pass
+                # One transaction for all figs; keep the parsed dicts that were stored
+                # (an ignored empty update leaves the cached data in place)
+                for fig_id in db.save_items(fresh, fresh_analyses):
+                    fig_data[fig_id] = fresh[fig_id]
+                    if fig_id in fresh_analyses:
+                        saved_analyses[fig_id] = fresh_analyses[fig_id]
+                load_data.clear()
+
+            # Pass 3: calculate from the now-warm data
+            for fig in inv:
+                fd = fig_data.get(fig['id'])
                 if fd:
                     try:
-                        fa = PriceAnalyzer(fd).analyze()
-                        p_new = fa['new']['market_price']
-                        p_used = fa['used']['market_price']
+                        fa = saved_analyses.get(fig['id'])
+                        if fa:
+                            p_new, p_used = fa['new']['market_price'], fa['used']['market_price']
+                        else:
+                            meta = fd.get("meta", {})
+                            p_new, p_used = fig_market_prices(fig['id'], meta.get("timestamp") or meta.get("cache_date"), fd)
                         
                         qty = fig.get('qty', fig.get('quantity', 1))
                         minifig_new += (p_new * qty)
@@ -446,10 +701,6 @@ def process_analysis(item_id, deep_scan_enabled, force_scrape=False, progress_ca
         "Rating": sniper.get("rating", "N/A"),
         "Status": analysis.get("deep_dive", {}).get("lifecycle", {}).get("status", "N/A")
     }
-
-    # Save to Collection
-    db.add_to_collection(item_id, "Ram's Collection")
-    db.close()
     
     return {
         "success": True,
@@ -462,121 +713,407 @@ def process_analysis(item_id, deep_scan_enabled, force_scrape=False, progress_ca
     }
 
 # --- DATA LOADING ---
-@st.cache_data(show_spinner=False, ttl=10)
-def load_data():
-    db = Database()
-    
-    # 1. Fetch Items
-    db.cursor.execute("SELECT item_id, json_data, updated_at FROM items")
-    all_rows = db.cursor.fetchall()
-    
-    # 2. Fetch Stale Items
-    stale_items = set(db.get_stale_items(days_threshold=30))
+class _CacheMiss(Exception):
+    """Raised by _cached_analysis when nothing is stored for the key; exceptions are never cached."""
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=500)
+def _cached_analysis(item_id, deep_scan_enabled, updated_at, _res=None):
+    """
+    Pure cache slot for an analysis: returns `_res` to store it, or raises _CacheMiss on a lookup (`_res` None).
+    The analysis itself runs outside, so its progress writes to Streamlit elements are never recorded for replay.
+    `updated_at` only keys the cache: a re-scraped item gets a new entry instead of a stale hit.
+    """
+    if _res is None:
+        raise _CacheMiss
+    return _res
+
+def analyze_item(item_id, deep_scan_enabled, force_scrape=False, progress_callback=None, db=None,
+                 items=None, inventories=None):
+    """
+    process_analysis behind a 1h cache keyed on (item_id, deep_scan_enabled, updated_at), so repeat lookups
+    skip the DB/scrape work. Progress is only reported on a miss; only successful analyses are stored.
+    A forced scrape bypasses the cache and drops the cached analyses.
+    A successful analysis adds the item to the collection, cache hit or not.
+    """
+    db = db or get_db()
+    if force_scrape:
+        _cached_analysis.clear()
+        res = process_analysis(item_id, deep_scan_enabled, force_scrape=True, progress_callback=progress_callback, db=db,
+                               items=items, inventories=inventories)
+    else:
+        if items is None:
+            items = db.get_items([item_id])  # The same row process_analysis would load; it reuses this one
+        updated_at = items.get(item_id, {}).get("meta", {}).get("cache_date")
+        try:
+            res = _cached_analysis(item_id, deep_scan_enabled, updated_at)
+        except _CacheMiss:
+            res = process_analysis(item_id, deep_scan_enabled, progress_callback=progress_callback, db=db,
+                                   items=items, inventories=inventories)
+            if res.get("success"):
+                _cached_analysis(item_id, deep_scan_enabled, updated_at, _res=res)
+
+    if res.get("success"):
+        db.add_to_collection(item_id, "Ram's Collection")
+    return res
+
+def analyze_batch(item_ids, deep_scan_enabled, force_scrape=False):
+    """
+    Runs analyze_item for several IDs in parallel (scrape-bound, so threads are enough).
+    Each worker thread gets its own Database, since the session one isn't thread-safe (and session_state
+    isn't reachable from worker threads); scrapes borrow from the shared pool. Plus a no-op progress callback,
+    since worker threads can't write to Streamlit widgets. Workers carry the session's script-run context,
+    so the st.cache_data lookup in analyze_item runs as it would on the main thread.
+    The items and set inventories are preloaded in one query each, instead of a round-trip per item.
+    Yields (item_id, future) in completion order.
+    """
+    from database import Database
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    db = get_db()
+    items = db.get_items(item_ids)
+    inventories = db.get_inventories([i for i in item_ids if not is_fig_id(i)])
+
+    local = threading.local()
+    dbs = []
+    lock = threading.Lock()
+
+    def analyze_one(item_id):
+        if not hasattr(local, "db"):
+            add_script_run_ctx(threading.current_thread(), ctx)
+            local.db = Database()
+            with lock:
+                dbs.append(local.db)
+        return analyze_item(item_id, deep_scan_enabled, force_scrape=force_scrape,
+                            progress_callback=lambda msg: None, db=local.db,
+                            items=items, inventories=inventories)
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(item_ids))) as executor:
+            futures = {executor.submit(analyze_one, item_id): item_id for item_id in item_ids}
+            for future in as_completed(futures):
+                yield futures[future], future
+    finally:
+        for d in dbs:
+            d.close()
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=5000)
+def analyze_cached(item_id, updated_at, _raw):
+    """
+    PriceAnalyzer result for a stored item; keyed on updated_at, so a re-scrape yields a new entry.
+    `_raw` is the decoded jsonb dict (JSON text on a not-yet-migrated DB) and is left out of the cache key.
+    """
+    return PriceAnalyzer(json_loads(_raw) if isinstance(_raw, str) else _raw).analyze()
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=5000)
+def fig_market_prices(fig_id, scraped_at, _fig_data):
+    """(New, Used) market price of a minifigure; keyed on its scrape time, so fresh data yields a new entry."""
+    fa = PriceAnalyzer(_fig_data).analyze()
+    return fa['new']['market_price'], fa['used']['market_price']
+
+def _figs_postprocess(used_prices, fig_sums, is_polybag):
+    """
+    Per-set numeric pass over plain arrays: polybag override, Figs % of the used price, part-out flag.
+    Returns (used_prices, figs_pct, polybag_mask, alert_mask).
+    """
+    # Polybag Override
+    polybag = is_polybag & (fig_sums > 0)
+    used = np.where(polybag, fig_sums, used_prices)
+
+    # Figs % for Used Sets
+    pct = np.divide(fig_sums * 100, used, out=np.zeros_like(used), where=used > 0)
+    return used, pct, polybag, pct > 80
+
+# Table columns are stored Arrow-backed so st.dataframe can serialize them without a numpy/object -> Arrow copy
+ARROW_FLOAT = "float64[pyarrow]"
+ARROW_STRING = "string[pyarrow]"
+SET_NUMERIC_COLS = ["New Price", "Used Price", "Profit", "Margin %", "Total Figs Value", "Figs %"]
+FIG_NUMERIC_COLS = ["New Price", "Used Price", "Profit", "Margin %"]
+FIG_STRING_COLS = ["ID", "Image", "Name", "Year", "New Conf", "Used Conf", "Rating", "Stale"]
+SET_STRING_COLS = FIG_STRING_COLS + ["Part-Out Alert"]
+
+# Table columns filled from PriceAnalyzer.summary_columns (same order)
+_ANALYSIS_COLUMNS = ["Name", "Year", "New Price", "New Conf", "Used Price", "Used Conf", "Profit", "Margin %", "Rating"]
+
+@st.cache_data(show_spinner=False, ttl=3600)  # Invalidated explicitly on scrape/import/delete
+def load_data(collection=None):
+    """
+    Returns (sets, figs) frames for the whole database, or only the items of `collection` when given.
+    InCollection flags membership of `collection` (Ram's Collection for the full view).
+    """
+    db = get_db()
+    owner = collection or "Ram's Collection"
     
-    # 3. Fetch Collection (DB + CSV)
+    # 1. Fetch Collection (DB + CSV)
     collection_ids = set()
     
-    # From DB
-    db_collection = db.get_collection_items("Ram's Collection")
-    for cid in db_collection:
-        collection_ids.add(cid.lower())
+    # From DB (figs of collected sets are resolved in the same query, so they count as owned too)
+    collection_ids.update(db.get_collection_member_ids(owner))
         
-    # From CSV (Legacy Support)
+    # From CSV (Legacy Support, Ram's Collection only)
+    csv_ids = set()
     try:
-        if os.path.exists("BrickEconomy-Sets(2).csv"):
-            df_csv = pd.read_csv("BrickEconomy-Sets(2).csv")
-            for _, row in df_csv.iterrows():
-                raw_id = str(row['Number']).strip().lower()
-                base_id = raw_id.split('-')[0] if '-' in raw_id else raw_id
-                collection_ids.add(base_id)
-                collection_ids.add(raw_id)
+        if owner == "Ram's Collection" and os.path.exists("BrickEconomy-Sets(2).csv"):
+            raw_ids = pd.read_csv("BrickEconomy-Sets(2).csv", usecols=["Number"])["Number"].astype(str).str.strip().str.lower()
+            csv_ids.update(raw_ids)
+            csv_ids.update(raw_ids.str.split('-').str[0])
     except: pass
-
-    # 4. Fetch Inventory Map
-    inventory_map = {}
-    db.cursor.execute("SELECT set_id, json_data FROM inventory_lists")
-    inv_rows = db.cursor.fetchall()
-    db.close() # Close DB connection early
-
-    for r in inv_rows:
-        s_id = str(r[0])
-        figs_data = json.loads(r[1])
-        inventory_map[s_id] = [f['id'] for f in figs_data]
+    collection_ids |= csv_ids
+
+    # 2. Fetch Inventory Edges (set -> fig, no JSON parsing)
+    inv_edges = pd.DataFrame(db.get_inventory_edges(), columns=["set_id", "fig_id"])
+
+    # If a CSV-listed set is owned, assume its figs are too (for visibility); DB sets were expanded in SQL
+    if csv_ids:
+        owned = inv_edges["set_id"].isin(csv_ids) | (inv_edges["set_id"] + "-1").isin(csv_ids)
+        collection_ids.update(inv_edges.loc[owned, "fig_id"].str.lower())
+
+    # 3. Fetch Items (precomputed summaries; raw JSON only for items not summarized yet),
+    # filtered in SQL to the collection's members when one is requested; junk IDs never leave the DB
+    all_rows = db.get_item_summaries(collection_ids if collection else None, exclude_pattern=JUNK_PATTERN)
+
+    df = pd.DataFrame(all_rows, columns=[
+        "DB ID", "Last Scraped", "Name", "Year", "New Price", "New Conf", "Used Price",
+        "Used Conf", "Profit", "Margin %", "Rating", "json_data"
+    ])
+    df["ID"] = df["DB ID"].astype(str).str.strip()
+
+    # Items without a summary yet: analyze once here and persist, so later loads skip them
+    missing = df["json_data"].notna()
+    if missing.any():
+        analyses = {}
+        analyzed_idx = []
+        failed = []
+        for idx, db_id, updated_at, raw in zip(df.index[missing], df.loc[missing, "DB ID"],
+                                               df.loc[missing, "Last Scraped"], df.loc[missing, "json_data"]):
+            try:
+                analyses[db_id] = analyze_cached(db_id, updated_at, raw)
+                analyzed_idx.append(idx)
+            except:
+                failed.append(idx)
+        if analyses:
+            # One block assignment for all analyzed rows instead of a .loc write per row
+            cols = PriceAnalyzer.summary_columns(list(analyses.values()))
+            df.loc[analyzed_idx, _ANALYSIS_COLUMNS] = pd.DataFrame(
+                dict(zip(_ANALYSIS_COLUMNS, cols.values())), index=analyzed_idx)
+        df = df.drop(index=failed)
+        db.save_price_summaries(analyses)
+
+    # Vectorized derived columns
+    ids = df["ID"]
+    is_fig = ids.str.contains(FIG_PATTERN)
+    img_id = ids.where(ids.str.contains("-"), ids + "-1")
+    df["Image"] = np.where(
+        is_fig,
+        "https://img.bricklink.com/ItemImage/MN/0/" + ids + ".png",
+        "https://img.bricklink.com/ItemImage/SN/0/" + img_id + ".png"
+    )
+    year = pd.to_numeric(df["Year"], errors="coerce")
+    df["Year"] = year.where(year > 0).astype("Int64").astype("string").fillna("")
+    df = df.fillna({"Name": "Unknown", "New Price": 0, "Used Price": 0, "Profit": 0, "Margin %": 0,
+                    "New Conf": "N/A", "Used Conf": "N/A", "Rating": "N/A"})
+    num_cols = ["New Price", "Used Price", "Profit", "Margin %"]
+    df[num_cols] = df[num_cols].astype(float)
+    df["InCollection"] = ids.str.lower().isin(collection_ids)
+    scraped_at = pd.to_datetime(df["Last Scraped"], utc=True, format="ISO8601", errors="coerce")
+    df["Stale"] = np.where(scraped_at < pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=30), "⚠️", "✅")
+
+    # ID -> used price as an indexed Series (last row wins on duplicate IDs) for hashed lookups in .map
+    price_map = df["Used Price"].set_axis(ids)
+    price_map = price_map[~price_map.index.duplicated(keep="last")]
+    columns = ["ID", "Image", "Name", "Year", "New Price", "New Conf", "Used Price", "Used Conf",
+               "Profit", "Margin %", "Rating", "InCollection", "Stale", "Last Scraped"]
+    df_sets = df.loc[~is_fig, columns].reset_index(drop=True)
+    figs = df.loc[is_fig, columns]
+
+    # Per-set fig count & value from the inventory edges, in a single groupby pass
+    edge_prices = inv_edges["fig_id"].map(price_map).fillna(0.0).astype(float)
+    fig_totals = edge_prices.groupby(inv_edges["set_id"]).agg(["size", "sum"])
+
+    # Fall back to the base set number (e.g. "75001-1" -> "75001") when there is no inventory under the full ID
+    set_ids = df_sets["ID"]
+    inv_key = set_ids.where(set_ids.isin(fig_totals.index), set_ids.str.split("-").str[0])
+    per_set = fig_totals.reindex(inv_key.to_numpy())
+    df_sets["Minifig Count"] = per_set["size"].fillna(0).astype(int).to_numpy()
+    fig_sum = per_set["sum"].fillna(0.0).to_numpy()
+    df_sets["Total Figs Value"] = fig_sum
+
+    used, pct, polybag, alert = _figs_postprocess(
+        df_sets["Used Price"].to_numpy(dtype=float),
+        fig_sum,
+        df_sets["Name"].str.contains("polybag|foil pack", case=False).to_numpy(dtype=bool)
+    )
+    df_sets["Used Price"] = used
+    df_sets.loc[polybag, "Used Conf"] = "Polybag (Figs)"
+    df_sets["Figs %"] = pct
+    df_sets["Part-Out Alert"] = np.where(alert, "🔥", "")
+
+    df_sets = df_sets.astype({**dict.fromkeys(SET_NUMERIC_COLS, ARROW_FLOAT), **dict.fromkeys(SET_STRING_COLS, ARROW_STRING)})
+    figs = figs.astype({**dict.fromkeys(FIG_NUMERIC_COLS, ARROW_FLOAT), **dict.fromkeys(FIG_STRING_COLS, ARROW_STRING)})
+    return df_sets, figs.reset_index(drop=True)
+
+_TOTAL_COLS = ["New Price", "Used Price", "Profit"]
+
+def _totals(arr):
+    """(New, Used, positive-only Profit) sums of an (n, 3) array in _TOTAL_COLS order."""
+    t_new, t_used = arr[:, :2].sum(axis=0)
+    t_profit = np.clip(arr[:, 2], 0, None).sum()  # Losses count as 0, no filtered copy
+    return float(t_new), float(t_used), float(t_profit)
+
+def frame_totals(df):
+    """(New, Used, positive-only Profit) totals of a load_data frame; zeros for an empty frame."""
+    return _totals(df[_TOTAL_COLS].to_numpy(dtype=float))
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def compute_totals(df_sets, df_figs):
+    """Portfolio (New, Used, positive-only Profit) totals over sets + figs in one reduction, cached per frame pair."""
+    return _totals(np.concatenate([df_sets[_TOTAL_COLS].to_numpy(dtype=float),
+                                   df_figs[_TOTAL_COLS].to_numpy(dtype=float)]))
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def prepare_display(df, sort_col="Profit", positive_col=None, limit=None):
+    """
+    Descending display frame (optionally positive-only, optionally just the top `limit` rows),
+    cached so unchanged data skips the re-sort on reruns.
+    """
+    if positive_col:
+        df = df[df[positive_col] > 0]
+    if limit:
+        return df.nlargest(limit, sort_col)  # Partial selection instead of a full sort
+    return df.sort_values(sort_col, ascending=False)
+
+
+# Collection tab tables (ranked tabs show the top rows only; "All Items" keeps the full list)
+COLLECTION_TOP_N = 200
+_COLLECTION_VIEWS = ["💎 Investment Hub", "⚔️ Part-Out Strategist", "📦 All Items", "👥 Minifigures"]
+_INVEST_COLS = ["Stale", "Image", "ID", "Name", "New Price", "New Conf", "Used Price", "Profit", "Margin %", "Rating"]
+_INVEST_CFG = {
+    "Image": st.column_config.ImageColumn("Img", width="small"),
+    "New Price": st.column_config.NumberColumn("New Price", format="%.2f ₪"),
+    "Used Price": st.column_config.NumberColumn("Used Price", format="%.2f ₪"),
+    "Profit": st.column_config.NumberColumn("Profit", format="%.2f ₪"),
+    "Margin %": st.column_config.ProgressColumn("Margin", format="%.0f%%", min_value=-50, max_value=100)
+}
+_PARTOUT_COLS = ["Stale", "Image", "ID", "Part-Out Alert", "Used Price", "Used Conf", "Total Figs Value", "Figs %"]
+_PARTOUT_CFG = {
+    "Image": st.column_config.ImageColumn("Img", width="small"),
+    "Part-Out Alert": st.column_config.TextColumn("Alert"),
+    "Figs %": st.column_config.ProgressColumn("Figs %", format="%.0f%%", min_value=0, max_value=150)
+}
+_IMAGE_ONLY_CFG = {"Image": st.column_config.ImageColumn()}
+
+# Main Database tables ("Last Scraped" is added per rerun since it depends on the user role)
+_MARKET_FIGS_CFG = {
+    "Image": st.column_config.ImageColumn("Img", width="small"),
+    "ID": st.column_config.TextColumn("ID", width="small"),
+    "Name": st.column_config.TextColumn("Name", width="medium"),
+    "New Price": st.column_config.NumberColumn("New Price", format="%.2f ₪"),
+    "Used Price": st.column_config.NumberColumn("Used Price", format="%.2f ₪"),
+    "Profit": st.column_config.NumberColumn("Profit", format="%.2f ₪"),
+    "Margin %": st.column_config.ProgressColumn("Margin", format="%.0f%%", min_value=-50, max_value=100),
+    "New Conf": st.column_config.TextColumn("New Conf", width="small"),
+    "Used Conf": st.column_config.TextColumn("Used Conf", width="small"),
+    "InCollection": None  # Hide this column
+}
+_MARKET_SETS_CFG = {
+    **_MARKET_FIGS_CFG,
+    "Rating": st.column_config.TextColumn("Rating", width="small"),
+    "Stale": st.column_config.CheckboxColumn("Stale", width="small")
+}
+_LAST_SCRAPED_CFG = st.column_config.DatetimeColumn("Last Scraped", format="DD/MM/YYYY HH:mm")
+_WAR_ROOM_CFG = {"🛒 Buy Link": st.column_config.LinkColumn("🛒 Buy Now", width="small")}
+
+def render_collection_dashboard(collection_name, delete_key, empty_tip, input_key=None, show_profit_help=False):
+    """Renders a personal collection page: metrics, Investment Hub / Part-Out / All Items / Minifigures tabs, delete action."""
+    st.title(f"🔐 {collection_name}")
+    st.caption("Personal investment portfolio")
+    
+    # Load data filtered to this collection only
+    df_sets, df_figs = load_data(collection_name)
+    
+    # Check if collection is empty
+    if df_sets.empty and df_figs.empty:
+        st.warning(f"📭 {collection_name} is empty")
+        st.info(empty_tip)
+        release_db()
+        st.stop()
+    
+    # Metrics
+    # Only positive profits count (actual investment opportunities)
+    t_new, t_used, t_profit = compute_totals(df_sets, df_figs)
         
-        # If set is in collection, assume its figs are too (for visibility)
-        if s_id in collection_ids or f"{s_id}-1" in collection_ids:
-            for f in figs_data:
-                collection_ids.add(f['id'].lower())
-
-    sets, figs = [], []
-    price_map = {} 
-    junk_keywords = ['python', 'streamlit', 'n', 'test', 'runner', 'cmd']
-
-    for row in all_rows:
-        item_id = str(row[0]).strip()
-        if any(key in item_id.lower() for key in junk_keywords) or len(item_id) < 2: continue
-
-        try:
-            raw_data = json.loads(row[1])
-            is_stale = item_id in stale_items
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Portfolio Value (New)", f"{t_new:,.0f} ₪")
+    m2.metric("Portfolio Value (Used)", f"{t_used:,.0f} ₪")
+    m3.metric("Total Profit Potential", f"{t_profit:,.0f} ₪")
+    
+    st.divider()
+    
+    # Only the selected view is rendered; st.tabs would build all four tables on every rerun
+    view = st.radio("View", _COLLECTION_VIEWS, horizontal=True, key=f"{delete_key}_view", label_visibility="collapsed")
+    
+    if view == _COLLECTION_VIEWS[0]:
+        st.caption("High ROI Secured Sets (New)")
+        
+        # Profit Explanation
+        if show_profit_help:
+            with st.expander("ℹ️ How is Profit Calculated?"):
+                st.markdown("""
+                **Profit Formula:**
+                ```
+                Profit = Market Price - (Cheapest Listing × 1.13)
+                ```
+            
+                **Breakdown:**
+                - **Market Price**: Estimated fair market value based on recent sales
+                - **Cheapest Listing**: Lowest priced "New" item currently available
+                - **1.13 multiplier**: Accounts for BrickLink fees (13%)
             
-            analysis = PriceAnalyzer(raw_data).analyze()
-            sniper = analysis.get("deep_dive", {}).get("sniper", {})
+                **Margin %:**
+                ```
+                Margin % = (Profit / Cheapest Listing) × 100
+                ```
             
-            yr = analysis.get("meta", {}).get("year_released")
-            year_val = str(int(float(yr))) if yr and str(yr).replace('.0','').isdigit() else ""
+                **Rating System:**
+                - 🟢 **EXCELLENT**: Margin ≥ 20%
+                - 🟡 **GOOD**: Margin ≥ 10%
+                - 🔴 **IRRELEVANT**: Margin < 10%
             
-            used_price = analysis.get("used", {}).get("market_price", 0)
-            price_map[item_id] = used_price
-
-            item = {
-                "ID": item_id,
-                "Image": get_img_url(item_id),
-                "Name": analysis.get("meta", {}).get("item_name", "Unknown"),
-                "Year": year_val,
-                "New Price": analysis.get("new", {}).get("market_price", 0),
-                "New Conf": analysis.get("new", {}).get("confidence", "N/A"),
-                "Used Price": used_price,
-                "Used Conf": analysis.get("used", {}).get("confidence", "N/A"),
-                "Profit": sniper.get("profit_abs", 0),
-                "Margin %": sniper.get("margin_pct", 0),
-                "Rating": sniper.get("rating", "N/A"),
-                "InCollection": item_id.lower() in collection_ids,
-                "Stale": "⚠️" if is_stale else "✅",
-                "Last Scraped": row[2] if len(row) > 2 else None
-            }
-            if any(c.isalpha() for c in item_id): figs.append(item)
-            else: sets.append(item)
-        except: continue
-
-    # Post-process sets for polybags & figs
-    for s in sets:
-        s_id = s["ID"]
-        fig_ids = inventory_map.get(s_id)
-        if not fig_ids and "-" in s_id: fig_ids = inventory_map.get(s_id.split("-")[0])
-
-        s["Minifig Count"] = len(fig_ids) if fig_ids else 0
-        s["Total Figs Value"] = 0.0
-        s["Figs %"] = 0.0
-        s["Part-Out Alert"] = ""
-
-        if fig_ids:
-            fig_sum = sum(price_map.get(fid, 0) for fid in fig_ids)
-            s["Total Figs Value"] = fig_sum
+                **Example:**
+                - Market Price: 500 ₪
+                - Cheapest Listing: 400 ₪
+                - Profit = 500 - (400 × 1.13) = 500 - 452 = **48 ₪**
+                - Margin = (48 / 400) × 100 = **12%** → GOOD
+                """)
+        
+        if not df_sets.empty:
+            df_new = prepare_display(df_sets, positive_col="New Price", limit=COLLECTION_TOP_N)
+            
+            st.dataframe(df_new, width="stretch", column_order=_INVEST_COLS, hide_index=True, column_config=_INVEST_CFG)
+
+    elif view == _COLLECTION_VIEWS[1]:
+        st.caption("Undervalued Used Sets (High Minifig Value)")
+        if not df_sets.empty:
+            df_used = prepare_display(df_sets, sort_col="Figs %", positive_col="Used Price", limit=COLLECTION_TOP_N)
+            st.dataframe(df_used, width="stretch", column_order=_PARTOUT_COLS, hide_index=True, column_config=_PARTOUT_CFG)
+
+    elif view == _COLLECTION_VIEWS[2]:
+        st.dataframe(df_sets, width="stretch", hide_index=True, column_config=_IMAGE_ONLY_CFG)
+
+    else:
+        if not df_figs.empty:
+            mf_new, mf_used, mf_profit = frame_totals(df_figs)
             
-            # Polybag Override
-            name_lower = s["Name"].lower()
-            if ("polybag" in name_lower or "foil pack" in name_lower) and fig_sum > 0:
-                s["Used Price"] = fig_sum
-                s["Used Conf"] = "Polybag (Figs)"
+            st.caption("Minifigure Collection Stats")
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Minifigs Value (New)", f"{mf_new:,.0f} ₪")
+            c2.metric("Minifigs Value (Used)", f"{mf_used:,.0f} ₪")
+            c3.metric("Minifigs Profit", f"{mf_profit:,.0f} ₪")
             
-            # Figs % for Used Sets
-            if s["Used Price"] > 0:
-                pct = (fig_sum / s["Used Price"]) * 100
-                s["Figs %"] = pct
-                if pct > 80: s["Part-Out Alert"] = "🔥"
+        st.dataframe(df_figs, width="stretch", hide_index=True, column_config=_IMAGE_ONLY_CFG)
 
-    return pd.DataFrame(sets), pd.DataFrame(figs)
+    with st.sidebar:
+        render_delete_actions(delete_key, input_key)
 
 # --- SIDEBAR NAV ---
 # Build navigation options based on role
@@ -606,7 +1143,7 @@ if mode == "🔎 Set Analyzer":
     deep_scan = st.sidebar.checkbox("Enable Deep Scan (Fix Zero Prices)", value=True, help="Force re-scrape for items with 0.00 price.")
     
     if st.sidebar.button("🔄 Reset Scraper Engine"):
-        get_scraper.clear()
+        reset_scraper()
         st.toast("Scraper rebooted!", icon="♻️")
         time.sleep(1)
         st.rerun()
@@ -623,23 +1160,18 @@ if mode == "📊 Set Analyzer Database":
         
         col_btn1, col_btn2 = st.columns(2)
         if col_btn1.button("🔄 Refresh Data"):
-            st.cache_data.clear()
+            load_data.clear()
             st.rerun()
         
         if col_btn2.button("📥 Import CSV"):
             try:
                 if os.path.exists("BrickEconomy-Sets(2).csv"):
-                    df_csv = pd.read_csv("BrickEconomy-Sets(2).csv")
-                    db = Database()
-                    count = 0
-                    for _, row in df_csv.iterrows():
-                        raw_id = str(row['Number']).strip()
-                        # Clean ID
-                        clean_id = raw_id.split('-')[0] if '-' in raw_id else raw_id
-                        db.add_to_collection(clean_id, "Ram's Collection")
-                        count += 1
-                    db.close()
-                    st.success(f"Successfully imported {count} items to Ram's Collection!")
+                    df_csv = pd.read_csv("BrickEconomy-Sets(2).csv", usecols=["Number"])
+                    # Clean IDs
+                    clean_ids = df_csv['Number'].astype(str).str.strip().str.split('-', n=1).str[0].unique()
+                    added = get_db().add_many_to_collection(clean_ids.tolist(), "Ram's Collection")
+                    load_data.clear()
+                    st.success(f"Successfully imported {added} new items to Ram's Collection ({len(clean_ids)} in file)!")
                     time.sleep(1)
                     st.rerun()
                 else:
@@ -652,27 +1184,16 @@ if mode == "📊 Set Analyzer Database":
     
     # Metrics
     # Metrics
-    t_new = 0
-    t_used = 0
-    t_profit = 0
-    
-    if not df_sets.empty:
-        t_new += df_sets["New Price"].sum()
-        t_used += df_sets["Used Price"].sum()
-        # Only sum positive profits (actual investment opportunities)
-        t_profit += df_sets[df_sets["Profit"] > 0]["Profit"].sum()
-        
-    if not df_figs.empty:
-        t_new += df_figs["New Price"].sum()
-        t_used += df_figs["Used Price"].sum()
-        # Only sum positive profits
-        t_profit += df_figs[df_figs["Profit"] > 0]["Profit"].sum()
+    # Only positive profits count (actual investment opportunities)
+    t_new, t_used, t_profit = compute_totals(df_sets, df_figs)
         
     m1, m2, m3 = st.columns(3)
     m1.metric("Portfolio Value (New)", f"{t_new:,.0f} ₪")
     m2.metric("Portfolio Value (Used)", f"{t_used:,.0f} ₪")
     m3.metric("Total Profit Potential", f"{t_profit:,.0f} ₪")
     
+    last_scraped_cfg = _LAST_SCRAPED_CFG if st.session_state.user_role == "admin" else None
+    
     st.divider()
     
     # Single table view for all sets
@@ -680,28 +1201,14 @@ if mode == "📊 Set Analyzer Database":
     
     if not df_sets.empty:
         # Sort by profit descending by default
-        df_display = df_sets.sort_values("Profit", ascending=False)
+        df_display = prepare_display(df_sets)
         
         st.dataframe(
             df_display,
             width="stretch",
             height=800,  # Double the default height
             hide_index=True,
-            column_config={
-                "Image": st.column_config.ImageColumn("Img", width="small"),
-                "ID": st.column_config.TextColumn("ID", width="small"),
-                "Name": st.column_config.TextColumn("Name", width="medium"),
-                "New Price": st.column_config.NumberColumn("New Price", format="%.2f ₪"),
-                "Used Price": st.column_config.NumberColumn("Used Price", format="%.2f ₪"),
-                "Profit": st.column_config.NumberColumn("Profit", format="%.2f ₪"),
-                "Margin %": st.column_config.ProgressColumn("Margin", format="%.0f%%", min_value=-50, max_value=100),
-                "Rating": st.column_config.TextColumn("Rating", width="small"),
-                "New Conf": st.column_config.TextColumn("New Conf", width="small"),
-                "Used Conf": st.column_config.TextColumn("Used Conf", width="small"),
-                "Stale": st.column_config.CheckboxColumn("Stale", width="small"),
-                "InCollection": None,  # Hide this column
-                "Last Scraped": st.column_config.DatetimeColumn("Last Scraped", format="DD/MM/YYYY HH:mm") if st.session_state.user_role == "admin" else None
-            }
+            column_config={**_MARKET_SETS_CFG, "Last Scraped": last_scraped_cfg}
         )
     else:
         st.info("No sets in database. Use Set Analyzer to scan items.")
@@ -712,9 +1219,7 @@ if mode == "📊 Set Analyzer Database":
     
     if not df_figs.empty:
         # Minifigure metrics
-        mf_new = df_figs["New Price"].sum()
-        mf_used = df_figs["Used Price"].sum()
-        mf_profit = df_figs[df_figs["Profit"] > 0]["Profit"].sum()
+        mf_new, mf_used, mf_profit = frame_totals(df_figs)
         
         c1, c2, c3 = st.columns(3)
         c1.metric("Minifigs Value (New)", f"{mf_new:,.0f} ₪")
@@ -722,38 +1227,21 @@ if mode == "📊 Set Analyzer Database":
         c3.metric("Minifigs Profit Potential", f"{mf_profit:,.0f} ₪")
         
         # Minifigures table
-        df_figs_display = df_figs.sort_values("Profit", ascending=False)
+        df_figs_display = prepare_display(df_figs)
         
         st.dataframe(
             df_figs_display,
             width="stretch",
             height=600,
             hide_index=True,
-            column_config={
-                "Image": st.column_config.ImageColumn("Img", width="small"),
-                "ID": st.column_config.TextColumn("ID", width="small"),
-                "Name": st.column_config.TextColumn("Name", width="medium"),
-                "New Price": st.column_config.NumberColumn("New Price", format="%.2f ₪"),
-                "Used Price": st.column_config.NumberColumn("Used Price", format="%.2f ₪"),
-                "Profit": st.column_config.NumberColumn("Profit", format="%.2f ₪"),
-                "Margin %": st.column_config.ProgressColumn("Margin", format="%.0f%%", min_value=-50, max_value=100),
-                "New Conf": st.column_config.TextColumn("New Conf", width="small"),
-                "Used Conf": st.column_config.TextColumn("Used Conf", width="small"),
-                "InCollection": None,  # Hide this column
-                "Last Scraped": st.column_config.DatetimeColumn("Last Scraped", format="DD/MM/YYYY HH:mm") if st.session_state.user_role == "admin" else None
-            }
+            column_config={**_MARKET_FIGS_CFG, "Last Scraped": last_scraped_cfg}
         )
     else:
         st.info("No minifigures in database.")
 
     if st.session_state.user_role == "admin":
-        st.sidebar.subheader("Actions")
-        del_id = st.sidebar.text_input("Delete Item ID")
-        if st.sidebar.button("Delete Item"):
-            if del_id:
-                delete_from_db(del_id)
-                st.cache_data.clear()
-                st.rerun()
+        with st.sidebar:
+            render_delete_actions()
 
     # 🎯 SNIPER WAR ROOM - Hot Deals Dashboard
     st.divider()
@@ -761,7 +1249,7 @@ if mode == "📊 Set Analyzer Database":
     st.caption("⚡ Best investment opportunities updated in the last 24 hours")
     
     try:
-        db = Database()
+        db = get_db()
         cutoff_time = (datetime.now() - timedelta(hours=24)).isoformat()
         
         # FAST query using cached columns (no JSON parsing needed)
@@ -795,259 +1283,28 @@ if mode == "📊 Set Analyzer Database":
             col1.metric("🔥 Hot Deals Found", len(war_room_items))
             col2.metric("💎 Total Profit Potential", f"{total_profit:,.0f} ₪")
             
-            st.dataframe(df_war, column_config={
-                "🛒 Buy Link": st.column_config.LinkColumn("🛒 Buy Now", width="small")
-            }, hide_index=True, use_container_width=True)
+            st.dataframe(df_war, column_config=_WAR_ROOM_CFG, hide_index=True, use_container_width=True)
         else:
             st.info("🔍 No hot deals in the last 24 hours. Check back later or run Set Analyzer to find new opportunities!")
-        
-        db.close()
     except Exception as e:
         st.warning(f"⚠️ War Room temporarily unavailable: {e}")
 
 
 elif mode == "🔐 Ram's Collection":
-    st.title("🔐 Ram's Collection")
-    st.caption("Personal investment portfolio")
-    
-    # Load data filtered to Ram's Collection only
-    df_sets, df_figs = load_data()
-    
-    # Filter to Ram's Collection
-    if not df_sets.empty:
-        df_sets = df_sets[df_sets["InCollection"] == True]
-    if not df_figs.empty:
-        df_figs = df_figs[df_figs["InCollection"] == True]
-    
-    # Check if collection is empty
-    if df_sets.empty and df_figs.empty:
-        st.warning("📭 Ram's Collection is empty")
-        st.info("💡 Tip: Use the Set Analyzer to scan items, then they'll be automatically added to your collection")
-        st.stop()
-    
-    # Metrics
-    t_new = 0
-    t_used = 0
-    t_profit = 0
-    
-    if not df_sets.empty:
-        t_new += df_sets["New Price"].sum()
-        t_used += df_sets["Used Price"].sum()
-        t_profit += df_sets[df_sets["Profit"] > 0]["Profit"].sum()
-        
-    if not df_figs.empty:
-        t_new += df_figs["New Price"].sum()
-        t_used += df_figs["Used Price"].sum()
-        t_profit += df_figs[df_figs["Profit"] > 0]["Profit"].sum()
-        
-    m1, m2, m3 = st.columns(3)
-    m1.metric("Portfolio Value (New)", f"{t_new:,.0f} ₪")
-    m2.metric("Portfolio Value (Used)", f"{t_used:,.0f} ₪")
-    m3.metric("Total Profit Potential", f"{t_profit:,.0f} ₪")
-    
-    st.divider()
-    
-    tab1, tab2, tab3, tab4 = st.tabs(["💎 Investment Hub", "⚔️ Part-Out Strategist", "📦 All Items", "👥 Minifigures"])
-    
-    with tab1:
-        st.caption("High ROI Secured Sets (New)")
-        
-        # Profit Explanation
-        with st.expander("ℹ️ How is Profit Calculated?"):
-            st.markdown("""
-            **Profit Formula:**
-            ```
-            Profit = Market Price - (Cheapest Listing × 1.13)
-            ```
-            
-            **Breakdown:**
-            - **Market Price**: Estimated fair market value based on recent sales
-            - **Cheapest Listing**: Lowest priced "New" item currently available
-            - **1.13 multiplier**: Accounts for BrickLink fees (13%)
-            
-            **Margin %:**
-            ```
-            Margin % = (Profit / Cheapest Listing) × 100
-            ```
-            
-            **Rating System:**
-            - 🟢 **EXCELLENT**: Margin ≥ 20%
-            - 🟡 **GOOD**: Margin ≥ 10%
-            - 🔴 **IRRELEVANT**: Margin < 10%
-            
-            **Example:**
-            - Market Price: 500 ₪
-            - Cheapest Listing: 400 ₪
-            - Profit = 500 - (400 × 1.13) = 500 - 452 = **48 ₪**
-            - Margin = (48 / 400) × 100 = **12%** → GOOD
-            """)
-        
-        if not df_sets.empty:
-            df_new = df_sets[df_sets["New Price"] > 0].sort_values("Profit", ascending=False)
-            
-            st.dataframe(
-                df_new,
-                width="stretch",
-                column_order=["Stale", "Image", "ID", "Name", "New Price", "New Conf", "Used Price", "Profit", "Margin %", "Rating"],
-                hide_index=True,
-                column_config={
-                    "Image": st.column_config.ImageColumn("Img", width="small"),
-                    "New Price": st.column_config.NumberColumn("New Price", format="%.2f ₪"),
-                    "Used Price": st.column_config.NumberColumn("Used Price", format="%.2f ₪"),
-                    "Profit": st.column_config.NumberColumn("Profit", format="%.2f ₪"),
-                    "Margin %": st.column_config.ProgressColumn("Margin", format="%.0f%%", min_value=-50, max_value=100)
-                }
-            )
-
-    with tab2:
-        st.caption("Undervalued Used Sets (High Minifig Value)")
-        if not df_sets.empty:
-            df_used = df_sets[df_sets["Used Price"] > 0].sort_values("Figs %", ascending=False)
-            st.dataframe(
-                df_used,
-                width="stretch",
-                column_order=["Stale", "Image", "ID", "Part-Out Alert", "Used Price", "Used Conf", "Total Figs Value", "Figs %"],
-                hide_index=True,
-                column_config={
-                    "Image": st.column_config.ImageColumn("Img", width="small"),
-                    "Part-Out Alert": st.column_config.TextColumn("Alert"),
-                    "Figs %": st.column_config.ProgressColumn("Figs %", format="%.0f%%", min_value=0, max_value=150)
-                }
-            )
-
-    with tab3:
-        st.dataframe(df_sets, width="stretch", hide_index=True, column_config={"Image": st.column_config.ImageColumn()})
-
-    with tab4:
-        if not df_figs.empty:
-            mf_new = df_figs["New Price"].sum()
-            mf_used = df_figs["Used Price"].sum()
-            mf_profit = df_figs[df_figs["Profit"] > 0]["Profit"].sum()
-            
-            st.caption("Minifigure Collection Stats")
-            c1, c2, c3 = st.columns(3)
-            c1.metric("Minifigs Value (New)", f"{mf_new:,.0f} ₪")
-            c2.metric("Minifigs Value (Used)", f"{mf_used:,.0f} ₪")
-            c3.metric("Minifigs Profit", f"{mf_profit:,.0f} ₪")
-            
-        st.dataframe(df_figs, width="stretch", hide_index=True, column_config={"Image": st.column_config.ImageColumn()})
-
-    st.sidebar.subheader("Actions")
-    del_id = st.sidebar.text_input("Delete Item ID")
-    if st.sidebar.button("Delete Item", key="delete_rams"):
-        if del_id:
-            delete_from_db(del_id)
-            st.cache_data.clear()
-            st.rerun()
+    render_collection_dashboard(
+        "Ram's Collection", "delete_rams",
+        "💡 Tip: Use the Set Analyzer to scan items, then they'll be automatically added to your collection",
+        show_profit_help=True
+    )
 
 
 elif mode == "🔐 Udi's Collection":
-    st.title("🔐 Udi's Collection")
-    st.caption("Personal investment portfolio")
-    
-    # Load data filtered to Udi's Collection only
-    df_sets, df_figs = load_data()
-    
-    # Filter to Udi's Collection (using a different collection name in database)
     # Note: Items need to be added to "Udi's Collection" via Set Analyzer
-    if not df_sets.empty:
-        # For now, show empty until items are added to Udi's collection
-        df_sets = df_sets[df_sets.get("Collection", "") == "Udi's Collection"] if "Collection" in df_sets.columns else pd.DataFrame()
-    if not df_figs.empty:
-        df_figs = df_figs[df_figs.get("Collection", "") == "Udi's Collection"] if "Collection" in df_figs.columns else pd.DataFrame()
-    
-    # Check if collection is empty
-    if df_sets.empty and df_figs.empty:
-        st.warning("📭 Udi's Collection is empty")
-        st.info("💡 Tip: Use the Set Analyzer to scan items and add them to Udi's collection")
-        st.stop()
-    
-    # Metrics
-    t_new = 0
-    t_used = 0
-    t_profit = 0
-    
-    if not df_sets.empty:
-        t_new += df_sets["New Price"].sum()
-        t_used += df_sets["Used Price"].sum()
-        t_profit += df_sets[df_sets["Profit"] > 0]["Profit"].sum()
-        
-    if not df_figs.empty:
-        t_new += df_figs["New Price"].sum()
-        t_used += df_figs["Used Price"].sum()
-        t_profit += df_figs[df_figs["Profit"] > 0]["Profit"].sum()
-        
-    m1, m2, m3 = st.columns(3)
-    m1.metric("Portfolio Value (New)", f"{t_new:,.0f} ₪")
-    m2.metric("Portfolio Value (Used)", f"{t_used:,.0f} ₪")
-    m3.metric("Total Profit Potential", f"{t_profit:,.0f} ₪")
-    
-    st.divider()
-    
-    tab1, tab2, tab3, tab4 = st.tabs(["💎 Investment Hub", "⚔️ Part-Out Strategist", "📦 All Items", "👥 Minifigures"])
-    
-    with tab1:
-        st.caption("High ROI Secured Sets (New)")
-        
-        if not df_sets.empty:
-            df_new = df_sets[df_sets["New Price"] > 0].sort_values("Profit", ascending=False)
-            
-            st.dataframe(
-                df_new,
-                width="stretch",
-                column_order=["Stale", "Image", "ID", "Name", "New Price", "New Conf", "Used Price", "Profit", "Margin %", "Rating"],
-                hide_index=True,
-                column_config={
-                    "Image": st.column_config.ImageColumn("Img", width="small"),
-                    "New Price": st.column_config.NumberColumn("New Price", format="%.2f ₪"),
-                    "Used Price": st.column_config.NumberColumn("Used Price", format="%.2f ₪"),
-                    "Profit": st.column_config.NumberColumn("Profit", format="%.2f ₪"),
-                    "Margin %": st.column_config.ProgressColumn("Margin", format="%.0f%%", min_value=-50, max_value=100)
-                }
-            )
-
-    with tab2:
-        st.caption("Undervalued Used Sets (High Minifig Value)")
-        if not df_sets.empty:
-            df_used = df_sets[df_sets["Used Price"] > 0].sort_values("Figs %", ascending=False)
-            st.dataframe(
-                df_used,
-                width="stretch",
-                column_order=["Stale", "Image", "ID", "Part-Out Alert", "Used Price", "Used Conf", "Total Figs Value", "Figs %"],
-                hide_index=True,
-                column_config={
-                    "Image": st.column_config.ImageColumn("Img", width="small"),
-                    "Part-Out Alert": st.column_config.TextColumn("Alert"),
-                    "Figs %": st.column_config.ProgressColumn("Figs %", format="%.0f%%", min_value=0, max_value=150)
-                }
-            )
-
-    with tab3:
-        st.dataframe(df_sets, width="stretch", hide_index=True, column_config={"Image": st.column_config.ImageColumn()})
-
-    with tab4:
-        if not df_figs.empty:
-            mf_new = df_figs["New Price"].sum()
-            mf_used = df_figs["Used Price"].sum()
-            mf_profit = df_figs[df_figs["Profit"] > 0]["Profit"].sum()
-            
-            st.caption("Minifigure Collection Stats")
-            c1, c2, c3 = st.columns(3)
-            c1.metric("Minifigs Value (New)", f"{mf_new:,.0f} ₪")
-            c2.metric("Minifigs Value (Used)", f"{mf_used:,.0f} ₪")
-            c3.metric("Minifigs Profit", f"{mf_profit:,.0f} ₪")
-            
-        st.dataframe(df_figs, width="stretch", hide_index=True, column_config={"Image": st.column_config.ImageColumn()})
-
-    st.sidebar.subheader("Actions")
-    del_id = st.sidebar.text_input("Delete Item ID", key="udi_delete_input")
-    if st.sidebar.button("Delete Item", key="delete_udis"):
-        if del_id:
-            delete_from_db(del_id)
-            st.cache_data.clear()
-            st.rerun()
-
-
+    render_collection_dashboard(
+        "Udi's Collection", "delete_udis",
+        "💡 Tip: Use the Set Analyzer to scan items and add them to Udi's collection",
+        input_key="udi_delete_input"
+    )
 
 
 elif mode == "🔎 Set Analyzer":
@@ -1071,42 +1328,19 @@ elif mode == "🔎 Set Analyzer":
     if "messages" not in st.session_state:
         st.session_state.messages = [{"role": "assistant", "content": "Hello! Enter Set IDs (e.g., '75001 75002')."}]
 
-    # Render History
-    for msg in st.session_state.messages:
-        with st.chat_message(msg["role"]):
-            # Render Expanders for Batch items
-            if "expanders" in msg:
-                for item in msg["expanders"]:
-                    with st.expander(f"📄 Report: {item['id']} - {item['name']}"):
-                        col_img, col_txt = st.columns([1,5])
-                        with col_img: st.image(item['main_img'], width="stretch")
-                        with col_txt: st.code(item['report'], language="text")
-                            
-                        if item['images']:
-                            st.write("### Minifigures")
-                            render_gallery_html(item['images'], item['captions'])
-
-            # If batch summary DF exists, show it (AT THE END)
-            if "batch_df" in msg:
-                st.dataframe(msg["batch_df"], width="stretch", hide_index=True)
-
-            # Standard Single Item Render
-            if "image_url" in msg and msg["image_url"]:
-                st.image(msg["image_url"], width=200)
-            
-            if msg.get("type") == "code":
-                st.code(msg["content"], language="text")
-            
-            if msg.get("content") and msg.get("type") != "code":
-                st.write(msg["content"])
-                
-            if "gallery_images" in msg:
-                st.markdown("### 👥 Minifigures Gallery")
-                render_gallery_html(msg["gallery_images"], msg["gallery_captions"])
+    # Render History (messages are stored pre-rendered: gallery markup and batch frames are built once, not per rerun).
+    # Only the recent messages replay on every rerun; archived ones are rendered on request.
+    archive = st.session_state.get("archive", [])
+    if archive and not st.session_state.get("show_archive"):
+        if st.button(f"⬆️ Load {len(archive)} older messages"):
+            st.session_state.show_archive = True
+    history = archive + st.session_state.messages if st.session_state.get("show_archive") else st.session_state.messages
+    for msg in history:
+        render_message(msg)
 
     # Chat Input
     if user_input := st.chat_input("Enter Set IDs (e.g., 76001, 75002)"):
-        st.session_state.messages.append({"role": "user", "content": user_input})
+        append_message({"role": "user", "content": user_input})
         with st.chat_message("user"):
             st.write(user_input)
 
@@ -1115,18 +1349,11 @@ elif mode == "🔎 Set Analyzer":
             st.warning("Cache cleared.")
         else:
             # Parse IDs and Flags
-            raw_input = user_input.replace(',', ' ').split()
-            ids = []
-            force_mode = False
-            
-            for token in raw_input:
-                token = token.strip()
-                if token.lower() in ['force', '--force', '-f']:
-                    force_mode = True
-                elif token:
-                    ids.append(token)
-            
-            raw_ids = ids
+            tokens = [t for t in _TOKEN_SPLIT.split(user_input) if t]
+            is_flag = [t.lower() in _FORCE_FLAGS for t in tokens]
+            force_mode = any(is_flag)
+            # Junk tokens are dropped here so they are never scraped and stored
+            raw_ids = [t for t, flag in zip(tokens, is_flag) if not flag and not is_junk_id(t)]
             
             # BATCH MODE
             if len(raw_ids) > 1:
@@ -1135,65 +1362,76 @@ elif mode == "🔎 Set Analyzer":
                     prog_bar = st.progress(0)
                     status_txt = st.empty()
                     
-                    summaries = []
-                    expanders_data = []
+                    # One slot per ID in input order; each is filled as soon as its item finishes
+                    slots = {item_id: st.empty() for item_id in dict.fromkeys(raw_ids)}
+                    expanders_by_id = {}
+                    
+                    # Summary rows are written straight into per-column arrays at their input position
+                    row_of = {item_id: row for row, item_id in enumerate(slots)}
+                    cols = {k: np.empty(len(slots), dtype=dt) for k, dt in SUMMARY_SCHEMA.items()}
+                    filled = np.zeros(len(slots), dtype=bool)
                     
-                    for i, item_id in enumerate(raw_ids):
-                        status_txt.write(f"Processing {item_id} ({i+1}/{len(raw_ids)})...")
+                    # Items are analyzed concurrently; progress follows completion order
+                    for i, (item_id, future) in enumerate(analyze_batch(raw_ids, deep_scan, force_scrape=force_mode)):
+                        status_txt.write(f"Processed {item_id} ({i+1}/{len(raw_ids)})...")
+                        slot = slots[item_id]
                         
                         try:
-                            # Pass force_scrape
-                            res = process_analysis(item_id, deep_scan, force_scrape=force_mode, progress_callback=status_txt.write)
+                            res = future.result()
                             
                             if res.get("success"):
-                                summaries.append(res["summary"])
-                                expanders_data.append({
+                                # Rendered once here; the live view and every history replay reuse the same HTML
+                                item = expanders_by_id[item_id] = {
                                     "id": res["item_id"],
                                     "name": res["summary"]["Name"],
-                                    "report": res["report"],
                                     "main_img": res["main_img"],
-                                    "images": res["images"],
-                                    "captions": res["captions"]
-                                })
+                                    "html": report_message_html(
+                                        res["main_img"], res["report"],
+                                        gallery_html(res["images"], res["captions"]) if res["images"] else "")
+                                }
+                                row = row_of[item_id]
+                                for k, v in res["summary"].items():
+                                    cols[k][row] = v
+                                filled[row] = True
+                                
+                                with slot.container():
+                                    with st.expander(f"📄 Report: {item['id']} - {item['name']}"):
+                                        st.markdown(item['html'], unsafe_allow_html=True)
                             else:
-                                st.error(f"Error {item_id}: {res.get('error')}")
+                                slot.error(f"Error {item_id}: {res.get('error')}")
                         except Exception as e:
-                            st.error(f"Crash on {item_id}: {e}")
+                            slot.error(f"Crash on {item_id}: {e}")
                         
                         prog_bar.progress((i + 1) / len(raw_ids))
                     
                     prog_bar.empty()
                     status_txt.empty()
                     
+                    # Keep the input order for the summary and history
+                    expanders_data = [expanders_by_id[item_id] for item_id in slots if item_id in expanders_by_id]
+                    
                     # Display Batch Result
-                    if summaries:
-                        df_summary = pd.DataFrame(summaries)
-                        
-                        # 1. Expanders
-                        for item in expanders_data:
-                            with st.expander(f"📄 Report: {item['id']} - {item['name']}"):
-                                col1, col2 = st.columns([1, 2])
-                                with col1: st.image(item['main_img'], width=350)
-                                with col2: st.code(item['report'], language="text")
-                                if item['images']:
-                                    st.write("### Minifigures")
-                                    render_gallery_html(item['images'], item['captions'])
-
-                        # 2. Summary Table (At the end)
-                        # Add totals row
-                        numeric_cols = df_summary.select_dtypes(include=['number']).columns
-                        totals = {col: df_summary[col].sum() for col in numeric_cols}
+                    if expanders_data:
+                        summary_cols = {k: col[filled] for k, col in cols.items()}
+                        df_summary = pd.DataFrame(summary_cols)
+
+                        # All analyzed sets at a glance, as one HTML grid
+                        render_gallery_html(gallery_html([e["main_img"] for e in expanders_data], [e["id"] for e in expanders_data]))
+
+                        # Summary Table (At the end)
+                        # Add totals row: appended to each column array, so the frame is built once (no concat copy)
+                        totals = dict.fromkeys(summary_cols)
+                        totals.update((k, summary_cols[k].sum()) for k in SUMMARY_NUMERIC_COLS)
                         totals['Name'] = '📊 TOTAL'
-                        totals_df = pd.DataFrame([totals])
-                        df_with_totals = pd.concat([df_summary, totals_df], ignore_index=True)
+                        df_with_totals = pd.DataFrame({k: np.append(v, totals[k]) for k, v in summary_cols.items()})
                         
                         st.dataframe(df_with_totals, width="stretch", hide_index=True)
 
                         # Save to History
-                        st.session_state.messages.append({
+                        append_message({
                             "role": "assistant",
                             "content": f"Batch completed for {len(raw_ids)} items.",
-                            "batch_df": df_summary,
+                            "batch_df": df_summary.head(MAX_HISTORY_BATCH_ROWS),
                             "expanders": expanders_data
                         })
                         st.toast("Batch Complete!", icon="✅")
@@ -1204,7 +1442,7 @@ elif mode == "🔎 Set Analyzer":
                 with st.chat_message("assistant"):
                     status_placeholder = st.empty()
                     # Pass force_scrape
-                    res = process_analysis(item_id, deep_scan, force_scrape=force_mode, progress_callback=status_placeholder.write)
+                    res = analyze_item(item_id, deep_scan, force_scrape=force_mode, progress_callback=status_placeholder.write)
                     status_placeholder.empty()
 
 
@@ -1215,18 +1453,16 @@ elif mode == "🔎 Set Analyzer":
                         with col2:
                             st.code(res["report"], language="text")
                         
-                        if res["images"]:
+                        res_gallery = gallery_html(res["images"], res["captions"]) if res["images"] else ""
+                        if res_gallery:
                             st.markdown("### 👥 Minifigures Gallery")
-                            render_gallery_html(res["images"], res["captions"])
+                            render_gallery_html(res_gallery)
 
-                        # Save to history
-                        st.session_state.messages.append({
+                        # Save to history, rendered once for replay
+                        append_message({
                             "role": "assistant",
                             "content": res["report"],
-                            "type": "code",
-                            "image_url": res["main_img"],
-                            "gallery_images": res["images"],
-                            "gallery_captions": res["captions"]
+                            "rendered_html": report_message_html(res["main_img"], res["report"], res_gallery)
                         })
                         st.toast(f"✅ {item_id} analyzed!", icon="💾")
                         
@@ -1238,16 +1474,14 @@ elif mode == "🔎 Set Analyzer":
                             
                         with col_ram:
                             if st.button(f"➕ Add to Ram's Collection"):
-                                db = Database()
-                                db.add_to_collection(item_id, "Ram's Collection")
-                                db.close()
+                                get_db().add_to_collection(item_id, "Ram's Collection")
                                 st.toast(f"Added {item_id} to Ram's Collection", icon="📂")
-                                st.cache_data.clear()
+                                load_data.clear()
                                 time.sleep(1)
                                 st.rerun()
 
-                        st.cache_data.clear()
+                        load_data.clear()  # Collection membership (and prices, if scraped) changed
                     else:
                         st.error(res.get("error"))
 
-
+release_db()  # Last statement of every full run: don't leave the read transaction open
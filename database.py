@@ -1,9 +1,21 @@
 import psycopg2
-import json
+from psycopg2.extras import Json, execute_values, register_default_jsonb
+try:
+    import orjson  # C parser/serializer; the stdlib json module is the fallback
+    json_loads = orjson.loads
+
+    def json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+except ImportError:
+    from json import loads as json_loads, dumps as json_dumps
+import io
 import os
 import logging
+from datetime import date, timedelta
 import streamlit as st
-from datetime import datetime, timedelta
+
+# jsonb columns arrive already decoded by psycopg2; decode them with the fast parser too
+register_default_jsonb(loads=json_loads, globally=True)
 
 # logging setup
 os.makedirs('logs', exist_ok=True)
@@ -13,6 +25,63 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# Per-connection tuning: enough sort memory for the summary/history queries.
+# Commits keep the server's durability default; only the bulk scripts relax it, per transaction.
+SESSION_SETTINGS = (
+    "work_mem = '64MB'",
+)
+
+# Scalar projection of every item; the raw JSON is only exposed while an item has no summary yet
+ITEM_SUMMARY_VIEW = '''
+    CREATE OR REPLACE VIEW item_summary AS
+    SELECT i.item_id, i.updated_at, s.item_name, s.year_released,
+           s.new_price, s.new_conf, s.used_price, s.used_conf,
+           s.profit_abs, s.margin_pct, s.rating,
+           CASE WHEN s.item_id IS NULL THEN i.json_data END AS json_data
+    FROM items i
+    LEFT JOIN price_summary s ON s.item_id = i.item_id;
+'''
+
+def _as_dict(json_data):
+    """An items.json_data value as a dict: jsonb arrives decoded, a not-yet-migrated TEXT column does not."""
+    return json_loads(json_data) if isinstance(json_data, (str, bytes)) else json_data
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+def copy_field(value):
+    """A value in COPY text format: NULL as \\N, backslash and the row/column separators escaped."""
+    if value is None:
+        return "\\N"
+    return str(value).translate(_COPY_ESCAPES)
+
+def copy_buffer(rows):
+    """Rows as a COPY ... FROM STDIN text-format stream (tab-separated, one line per row)."""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(copy_field(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+FRESHNESS_DAYS = 30  # Scanners re-scrape items whose last update is older than this
+
+def fresh_item_ids(freshness, max_age_days=FRESHNESS_DAYS, today=None):
+    """
+    IDs from a get_items_freshness() map whose last update is newer than `max_age_days` before `today`.
+    An unparseable timestamp counts as fresh: the item is stored, only its date is unreadable.
+    """
+    cutoff = (today or date.today()) - timedelta(days=max_age_days)
+    fresh = set()
+    for item_id, last_updated in freshness.items():
+        if not last_updated:
+            continue
+        try:
+            if date.fromisoformat(last_updated[:10]) > cutoff:
+                fresh.add(item_id)
+        except ValueError:
+            fresh.add(item_id)
+    return fresh
+
 class Database:
     """
     Handles PostgreSQL (Supabase) database interactions.
@@ -33,6 +102,7 @@ class Database:
                 password=db_config["password"]
             )
             self.cursor = self.conn.cursor()
+            self._apply_session_settings()
             
             # Connection Check (Optional, but good for UI feedback if called explicitly)
             # st.sidebar.success("Connected to Cloud DB") 
@@ -44,6 +114,16 @@ class Database:
             st.error(f"Database Connection Failed: {e}")
             raise e
 
+    def _apply_session_settings(self):
+        """Applies SESSION_SETTINGS; a pooler that rejects them just leaves the server defaults."""
+        try:
+            for setting in SESSION_SETTINGS:
+                self.cursor.execute(f"SET {setting}")
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logging.warning(f"Session settings skipped: {e}")
+
     def _init_tables(self):
         """Creates the necessary tables if they don't exist (Postgres syntax)."""
         try:
@@ -51,8 +131,8 @@ class Database:
             self.cursor.execute('''
                 CREATE TABLE IF NOT EXISTS items (
                     item_id TEXT PRIMARY KEY,
-                    json_data TEXT,
-                    updated_at TIMESTAMPTZ
+                    json_data JSONB,
+                    updated_at TIMESTAMPTZ DEFAULT NOW()
                 );
             ''')
             
@@ -61,7 +141,7 @@ class Database:
                 CREATE TABLE IF NOT EXISTS inventory_lists (
                     set_id TEXT PRIMARY KEY,
                     json_data TEXT,
-                    updated_at TIMESTAMPTZ
+                    updated_at TIMESTAMPTZ DEFAULT NOW()
                 );
             ''')
 
@@ -70,7 +150,7 @@ class Database:
                 CREATE TABLE IF NOT EXISTS collections (
                     item_id TEXT,
                     collection_name TEXT,
-                    added_at TIMESTAMPTZ,
+                    added_at TIMESTAMPTZ DEFAULT NOW(),
                     PRIMARY KEY (item_id, collection_name)
                 );
             ''')
@@ -84,7 +164,7 @@ class Database:
                     price_used REAL,
                     confidence_new TEXT,
                     confidence_used TEXT,
-                    scraped_at TIMESTAMPTZ NOT NULL,
+                    scraped_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
                     FOREIGN KEY (item_id) REFERENCES items(item_id) ON DELETE CASCADE
                 );
             ''')
@@ -99,64 +179,227 @@ class Database:
             self.cursor.execute('ALTER TABLE items ADD COLUMN IF NOT EXISTS cached_margin REAL;')
             self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_cached_rating ON items(cached_rating);')
             
+            # Table for precomputed PriceAnalyzer summaries (read by the dashboard instead of re-analyzing)
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS price_summary (
+                    item_id TEXT PRIMARY KEY,
+                    item_name TEXT,
+                    year_released INTEGER,
+                    new_price REAL,
+                    used_price REAL,
+                    new_conf TEXT,
+                    used_conf TEXT,
+                    profit_abs REAL,
+                    margin_pct REAL,
+                    rating TEXT,
+                    status TEXT,
+                    FOREIGN KEY (item_id) REFERENCES items(item_id) ON DELETE CASCADE
+                );
+            ''')
+
+            # Flat set -> minifig edges, written alongside inventory_lists so readers skip the JSON
+            self.cursor.execute('''
+                CREATE TABLE IF NOT EXISTS inventory_edges (
+                    set_id TEXT,
+                    fig_id TEXT,
+                    qty INTEGER,
+                    PRIMARY KEY (set_id, fig_id),
+                    FOREIGN KEY (set_id) REFERENCES inventory_lists(set_id) ON DELETE CASCADE
+                );
+            ''')
+
+            self.cursor.execute(ITEM_SUMMARY_VIEW)
+
+            # Collection lookups filter by name; collection pages match items by normalized ID
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_collections_name ON collections(collection_name);')
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_norm_id ON items(LOWER(TRIM(item_id)));')
+            # Anchored LIKE 'sh%' (get_items_by_prefix) can only use a btree with the pattern opclass
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_id_prefix ON items(item_id text_pattern_ops);')
+            
             self.conn.commit()
         except Exception as e:
             self.conn.rollback()
             logging.error(f"Table Init Failed: {e}")
 
-    def save_item(self, item_id, data):
-        """Saves scraped item data (Upsert) and records price history."""
+    def save_item(self, item_id, data, analysis=None):
+        """
+        Saves scraped item data (Upsert) and records price history. Returns True if the data was written.
+        Pass the item's PriceAnalyzer result as `analysis` if the caller already has it; otherwise it is computed here.
+        """
         if self._is_empty_scrape(data):
             # Check if exists to avoid overwriting with bad data
-            if self.get_item(item_id):
+            if self._exists(item_id):
                 logging.warning(f"🛡️ Ignoring empty update for {item_id}")
-                return
+                return False
 
-        now = datetime.now().isoformat()
-        json_str = json.dumps(data)
-        
-        # Calculate cached values for fast queries
-        try:
-            from pricing_engine import PriceAnalyzer
-            analysis = PriceAnalyzer(data).analyze()
-            rating = analysis.get("deep_dive", {}).get("sniper", {}).get("rating", "N/A")
-            profit = analysis.get("deep_dive", {}).get("sniper", {}).get("profit_abs", 0)
-            margin = analysis.get("deep_dive", {}).get("sniper", {}).get("margin_pct", 0)
-            price_new = analysis.get("new", {}).get("market_price", 0)
-            price_used = analysis.get("used", {}).get("market_price", 0)
-            conf_new = analysis.get("new", {}).get("confidence", "N/A")
-            conf_used = analysis.get("used", {}).get("confidence", "N/A")
-        except:
-            rating, profit, margin = "N/A", 0, 0
-            price_new, price_used = 0, 0
-            conf_new, conf_used = "N/A", "N/A"
-        
         try:
-            # Save/update main item
-            query = '''
-                INSERT INTO items (item_id, json_data, updated_at, cached_rating, cached_profit, cached_margin)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (item_id) 
-                DO UPDATE SET 
-                    json_data = EXCLUDED.json_data,
-                    updated_at = EXCLUDED.updated_at,
-                    cached_rating = EXCLUDED.cached_rating,
-                    cached_profit = EXCLUDED.cached_profit,
-                    cached_margin = EXCLUDED.cached_margin;
-            '''
-            self.cursor.execute(query, (item_id, json_str, now, rating, profit, margin))
-            
-            # Record price history
-            history_query = '''
-                INSERT INTO price_history (item_id, price_new, price_used, confidence_new, confidence_used, scraped_at)
-                VALUES (%s, %s, %s, %s, %s, %s);
-            '''
-            self.cursor.execute(history_query, (item_id, price_new, price_used, conf_new, conf_used, now))
-            
+            self._write_items({item_id: data}, {item_id: analysis} if analysis else None)
             self.conn.commit()
+            return True
         except Exception as e:
             self.conn.rollback()
             logging.error(f"Failed to save item {item_id}: {e}")
+            return False
+
+    def save_items(self, items, analyses=None):
+        """
+        Saves several scraped items ({item_id: data}) in a single transaction.
+        `analyses` ({item_id: PriceAnalyzer result}) skips re-analyzing items the caller already analyzed.
+        Returns the set of item IDs that were written (empty if the transaction failed).
+        """
+        if not items:
+            return set()
+
+        try:
+            # Same guard as save_item: empty scrapes never overwrite existing rows
+            empty_ids = [item_id for item_id, data in items.items() if self._is_empty_scrape(data)]
+            existing = set()
+            if empty_ids:
+                self.cursor.execute('SELECT item_id FROM items WHERE item_id = ANY(%s)', (empty_ids,))
+                existing = {row[0] for row in self.cursor.fetchall()}
+            for item_id in existing:
+                logging.warning(f"🛡️ Ignoring empty update for {item_id}")
+
+            to_write = {item_id: data for item_id, data in items.items() if item_id not in existing}
+            self._write_items(to_write, analyses)
+            self.conn.commit()
+            return set(to_write)
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Failed to save {len(items)} items: {e}")
+            return set()
+
+    def _exists(self, item_id):
+        """True if the item has a row (primary-key probe; the JSON is never read)."""
+        try:
+            self.cursor.execute('SELECT 1 FROM items WHERE item_id = %s', (item_id,))
+            return self.cursor.fetchone() is not None
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Item Exists Check Failed: {e}")
+            return False
+
+    def _write_items(self, items, analyses=None):
+        """
+        Upserts the item rows, their price history entries and price summaries (caller commits).
+        Each table is written with one multi-row statement, so a batch costs 3 round-trips, not 3 per item.
+        Items missing from `analyses` are analyzed here. Timestamps are the server's NOW() (the
+        transaction start), so every row of a batch shares one; the history rows take it from the upsert.
+        """
+        from pricing_engine import PriceAnalyzer
+
+        analyses = analyses or {}
+        item_rows, history_rows, summary_rows = [], [], []
+        for item_id, data in items.items():
+            # Calculate cached values for fast queries
+            analysis = analyses.get(item_id)
+            try:
+                if analysis is None:
+                    analysis = PriceAnalyzer(data).analyze()
+                rating = analysis.get("deep_dive", {}).get("sniper", {}).get("rating", "N/A")
+                profit = analysis.get("deep_dive", {}).get("sniper", {}).get("profit_abs", 0)
+                margin = analysis.get("deep_dive", {}).get("sniper", {}).get("margin_pct", 0)
+                price_new = analysis.get("new", {}).get("market_price", 0)
+                price_used = analysis.get("used", {}).get("market_price", 0)
+                conf_new = analysis.get("new", {}).get("confidence", "N/A")
+                conf_used = analysis.get("used", {}).get("confidence", "N/A")
+            except:
+                rating, profit, margin = "N/A", 0, 0
+                price_new, price_used = 0, 0
+                conf_new, conf_used = "N/A", "N/A"
+
+            item_rows.append((item_id, Json(data, dumps=json_dumps), rating, profit, margin))
+            history_rows.append((item_id, price_new, price_used, conf_new, conf_used))
+            if analysis:
+                summary_rows.append(self._summary_row(item_id, analysis))
+
+        if not item_rows:
+            return
+
+        # Save/update main items
+        written = execute_values(self.cursor, '''
+            INSERT INTO items (item_id, json_data, cached_rating, cached_profit, cached_margin, updated_at)
+            VALUES %s
+            ON CONFLICT (item_id) 
+            DO UPDATE SET 
+                json_data = EXCLUDED.json_data,
+                updated_at = NOW(),
+                cached_rating = EXCLUDED.cached_rating,
+                cached_profit = EXCLUDED.cached_profit,
+                cached_margin = EXCLUDED.cached_margin
+            RETURNING updated_at;
+        ''', item_rows, template="(%s, %s, %s, %s, %s, NOW())", page_size=len(item_rows), fetch=True)
+
+        # Record price history
+        scraped_at = written[0][0]
+        self._copy_price_history([(*row, scraped_at) for row in history_rows])
+
+        self._upsert_price_summaries(summary_rows)
+
+    def _copy_price_history(self, rows):
+        """
+        Appends price_history rows with COPY FROM STDIN (caller commits): the rows stream as
+        tab-separated text with no per-statement parse/plan, the cheapest bulk path for an insert-only table.
+        """
+        self.cursor.copy_expert(
+            "COPY price_history (item_id, price_new, price_used, confidence_new, confidence_used, scraped_at) FROM STDIN",
+            copy_buffer(rows)
+        )
+
+    def _summary_row(self, item_id, analysis):
+        """price_summary row for an analyzed item."""
+        meta = analysis.get("meta", {})
+        sniper = analysis.get("deep_dive", {}).get("sniper") or {}
+        year = meta.get("year_released")
+        try:
+            year = int(float(year)) if year else None
+        except (TypeError, ValueError):
+            year = None
+
+        return (
+            item_id,
+            meta.get("item_name", "Unknown"),
+            year,
+            analysis.get("new", {}).get("market_price", 0),
+            analysis.get("used", {}).get("market_price", 0),
+            analysis.get("new", {}).get("confidence", "N/A"),
+            analysis.get("used", {}).get("confidence", "N/A"),
+            sniper.get("profit_abs", 0),
+            sniper.get("margin_pct", 0),
+            sniper.get("rating", "N/A"),
+            analysis.get("deep_dive", {}).get("lifecycle", {}).get("status", "N/A")
+        )
+
+    def _upsert_price_summaries(self, rows):
+        """Writes dashboard summary rows in one statement (caller commits)."""
+        if not rows:
+            return
+        execute_values(self.cursor, '''
+            INSERT INTO price_summary (item_id, item_name, year_released, new_price, used_price,
+                                       new_conf, used_conf, profit_abs, margin_pct, rating, status)
+            VALUES %s
+            ON CONFLICT (item_id)
+            DO UPDATE SET
+                item_name = EXCLUDED.item_name,
+                year_released = EXCLUDED.year_released,
+                new_price = EXCLUDED.new_price,
+                used_price = EXCLUDED.used_price,
+                new_conf = EXCLUDED.new_conf,
+                used_conf = EXCLUDED.used_conf,
+                profit_abs = EXCLUDED.profit_abs,
+                margin_pct = EXCLUDED.margin_pct,
+                rating = EXCLUDED.rating,
+                status = EXCLUDED.status;
+        ''', rows, page_size=len(rows))
+
+    def save_price_summaries(self, analyses):
+        """Upserts summary rows for {item_id: analysis} in one transaction."""
+        try:
+            self._upsert_price_summaries([self._summary_row(item_id, a) for item_id, a in analyses.items()])
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Save Price Summaries Failed: {e}")
 
     def get_item(self, item_id):
         """Retrieves an item's data."""
@@ -164,7 +407,7 @@ class Database:
             self.cursor.execute('SELECT json_data, updated_at FROM items WHERE item_id = %s', (item_id,))
             row = self.cursor.fetchone()
             if row:
-                data = json.loads(row[0])
+                data = _as_dict(row[0])
                 if "meta" in data:
                     data["meta"]["cache_date"] = str(row[1])
                 return data
@@ -173,50 +416,144 @@ class Database:
             logging.error(f"Get Item Failed: {e}")
             return None
 
+    def get_items(self, item_ids):
+        """Retrieves several items' data in one query. Returns {item_id: data} (missing IDs omitted)."""
+        try:
+            self.cursor.execute('SELECT item_id, json_data, updated_at FROM items WHERE item_id = ANY(%s)', (list(item_ids),))
+            results = {}
+            for item_id, json_data, updated_at in self.cursor.fetchall():
+                data = _as_dict(json_data)
+                if "meta" in data:
+                    data["meta"]["cache_date"] = str(updated_at)
+                results[item_id] = data
+            return results
+        except Exception as e:
+            logging.error(f"Get Items Failed: {e}")
+            return {}
+
+    def get_item_summaries(self, item_ids=None, exclude_pattern=None):
+        """
+        Returns item_summary rows: (item_id, updated_at, name, year, new/used price & conf, profit, margin, rating, json_data).
+        If item_ids is given, only rows whose lowercased ID is in it are returned.
+        If exclude_pattern is given, IDs matching it (case-insensitive regex) or shorter than 2 chars are skipped.
+        """
+        try:
+            query = '''
+                SELECT item_id, updated_at, item_name, year_released,
+                       new_price, new_conf, used_price, used_conf,
+                       profit_abs, margin_pct, rating, json_data
+                FROM item_summary
+            '''
+            conditions, params = [], []
+            if item_ids is not None:
+                conditions.append('LOWER(TRIM(item_id)) = ANY(%s)')
+                params.append(list(item_ids))
+            if exclude_pattern is not None:
+                conditions.append('LENGTH(TRIM(item_id)) >= 2 AND TRIM(item_id) !~* %s')
+                params.append(exclude_pattern)
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            self.cursor.execute(query, params)
+            return self.cursor.fetchall()
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Get Item Summaries Failed: {e}")
+            return []
+
     def save_inventory(self, set_id, data):
         """Saves inventory list (Upsert)."""
-        now = datetime.now().isoformat()
-        json_str = json.dumps(data)
         try:
             query = '''
                 INSERT INTO inventory_lists (set_id, json_data, updated_at)
-                VALUES (%s, %s, %s)
+                VALUES (%s, %s, NOW())
                 ON CONFLICT (set_id)
                 DO UPDATE SET
                     json_data = EXCLUDED.json_data,
-                    updated_at = EXCLUDED.updated_at;
+                    updated_at = NOW();
             '''
-            self.cursor.execute(query, (set_id, json_str, now))
+            self.cursor.execute(query, (set_id, Json(data, dumps=json_dumps)))
+            self._replace_inventory_edges(set_id, data)
             self.conn.commit()
         except Exception as e:
             self.conn.rollback()
             logging.error(f"Save Inventory Failed: {e}")
 
+    def _replace_inventory_edges(self, set_id, data):
+        """Rewrites a set's inventory_edges rows from its inventory list (caller commits)."""
+        edges = {}
+        for fig in data or []:
+            edges[fig['id']] = edges.get(fig['id'], 0) + fig.get('qty', fig.get('quantity', 1))
+
+        self.cursor.execute('DELETE FROM inventory_edges WHERE set_id = %s', (set_id,))
+        if edges:
+            execute_values(self.cursor,
+                'INSERT INTO inventory_edges (set_id, fig_id, qty) VALUES %s',
+                [(set_id, fig_id, qty) for fig_id, qty in edges.items()])
+
+    def get_inventory_edges(self):
+        """Returns all (set_id, fig_id) inventory edges."""
+        try:
+            self.cursor.execute('SELECT set_id, fig_id FROM inventory_edges')
+            return self.cursor.fetchall()
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Get Inventory Edges Failed: {e}")
+            return []
+
     def get_inventory(self, set_id):
         """Retrieves inventory list."""
         try:
             self.cursor.execute('SELECT json_data, updated_at FROM inventory_lists WHERE set_id = %s', (set_id,))
             row = self.cursor.fetchone()
             if row:
-                return json.loads(row[0]), str(row[1])
+                return json_loads(row[0]), str(row[1])
             return None, None
         except: return None, None
 
+    def get_inventories(self, set_ids):
+        """Retrieves several inventory lists in one query. Returns {set_id: data} (missing IDs omitted)."""
+        try:
+            self.cursor.execute('SELECT set_id, json_data FROM inventory_lists WHERE set_id = ANY(%s)', (list(set_ids),))
+            return {set_id: json_loads(json_data) for set_id, json_data in self.cursor.fetchall()}
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Get Inventories Failed: {e}")
+            return {}
+
     def add_to_collection(self, item_id, collection_name):
         """Adds to collection (Ignore if exists)."""
-        now = datetime.now().isoformat()
         try:
             query = '''
                 INSERT INTO collections (item_id, collection_name, added_at)
-                VALUES (%s, %s, %s)
+                VALUES (%s, %s, NOW())
                 ON CONFLICT (item_id, collection_name) DO NOTHING;
             '''
-            self.cursor.execute(query, (item_id, collection_name, now))
+            self.cursor.execute(query, (item_id, collection_name))
             self.conn.commit()
         except Exception as e:
             self.conn.rollback()
             logging.error(f"Add to Collection Failed: {e}")
 
+    def add_many_to_collection(self, item_ids, collection_name):
+        """Adds several items to a collection in one statement (existing entries ignored). Returns rows inserted."""
+        rows = [(item_id, collection_name) for item_id in item_ids]
+        if not rows:
+            return 0
+        try:
+            # Single page, so the rowcount covers every row (execute_values pages by 100 by default)
+            execute_values(self.cursor, '''
+                INSERT INTO collections (item_id, collection_name, added_at)
+                VALUES %s
+                ON CONFLICT (item_id, collection_name) DO NOTHING
+            ''', rows, template="(%s, %s, NOW())", page_size=len(rows))
+            inserted = self.cursor.rowcount
+            self.conn.commit()
+            return inserted
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Add Many To Collection Failed: {e}")
+            return 0
+
     def remove_from_collection(self, item_id, collection_name):
         """Removes from collection."""
         try:
@@ -233,11 +570,30 @@ class Database:
             return [row[0] for row in self.cursor.fetchall()]
         except: return []
 
+    def get_collection_member_ids(self, collection_name):
+        """
+        Returns the lowercased IDs owned through a collection in one query: its items plus
+        the minifigs inventoried in its sets (set stored as '75001' or '75001-1').
+        """
+        try:
+            self.cursor.execute('''
+                SELECT LOWER(item_id) FROM collections WHERE collection_name = %s
+                UNION
+                SELECT LOWER(e.fig_id)
+                FROM collections c
+                JOIN inventory_edges e ON e.set_id IN (c.item_id, regexp_replace(c.item_id, '-1$', ''))
+                WHERE c.collection_name = %s
+            ''', (collection_name, collection_name))
+            return [row[0] for row in self.cursor.fetchall()]
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Get Collection Members Failed: {e}")
+            return []
+
     def get_stale_items(self, days_threshold=30):
         """Identifies stale items."""
         try:
-            limit_date = (datetime.now() - timedelta(days=days_threshold)).isoformat()
-            self.cursor.execute('SELECT item_id FROM items WHERE updated_at < %s', (limit_date,))
+            self.cursor.execute('SELECT item_id FROM items WHERE updated_at < NOW() - make_interval(days => %s)', (days_threshold,))
             return [row[0] for row in self.cursor.fetchall()]
         except: return []
 
@@ -264,7 +620,7 @@ class Database:
             results = []
             for row in rows:
                 if row[0]:
-                    data = json.loads(row[0])
+                    data = _as_dict(row[0])
                     if "meta" in data:
                         data["meta"]["cache_date"] = str(row[1])
                     results.append(data)
@@ -273,16 +629,54 @@ class Database:
             logging.error(f"Get Items By Prefix Failed: {e}")
             return []
     
+    def get_items_freshness(self, item_ids):
+        """
+        Returns {item_id: last_updated_iso} for the given IDs in a single query (error entries excluded).
+        If a blob that won't cast to jsonb (not-yet-migrated TEXT column) breaks the query, the rows are
+        re-read and parsed one by one, so only the corrupt row is left out.
+        """
+        try:
+            self.cursor.execute('''
+                SELECT item_id, COALESCE(json_data::jsonb -> 'meta' ->> 'timestamp', updated_at::text)
+                FROM items
+                WHERE item_id = ANY(%s) AND NOT (json_data::jsonb ? 'error')
+            ''', (list(item_ids),))
+            return {row[0]: row[1] for row in self.cursor.fetchall()}
+        except Exception as e:
+            self.conn.rollback()
+            logging.warning(f"Get Items Freshness falling back to per-row parsing: {e}")
+
+        try:
+            self.cursor.execute('SELECT item_id, json_data::text, updated_at::text FROM items WHERE item_id = ANY(%s)',
+                                (list(item_ids),))
+            results = {}
+            for item_id, json_text, updated_at in self.cursor.fetchall():
+                try:
+                    data = json_loads(json_text)
+                except (TypeError, ValueError) as e:
+                    logging.error(f"Corrupted JSON for {item_id}, treated as missing: {e}")
+                    continue
+                if isinstance(data, dict) and "error" not in data:
+                    results[item_id] = data.get("meta", {}).get("timestamp") or updated_at
+            return results
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Get Items Freshness Failed: {e}")
+            return {}
+
+    def get_fresh_item_ids(self, item_ids, max_age_days=FRESHNESS_DAYS):
+        """The subset of item_ids updated within the last `max_age_days` (see fresh_item_ids)."""
+        return fresh_item_ids(self.get_items_freshness(item_ids), max_age_days)
+    
     def get_price_history(self, item_id, days=30):
         """Retrieves price history for an item over the last N days."""
         try:
-            limit_date = (datetime.now() - timedelta(days=days)).isoformat()
             self.cursor.execute('''
                 SELECT price_new, price_used, confidence_new, confidence_used, scraped_at
                 FROM price_history
-                WHERE item_id = %s AND scraped_at > %s
+                WHERE item_id = %s AND scraped_at > NOW() - make_interval(days => %s)
                 ORDER BY scraped_at DESC
-            ''', (item_id, limit_date))
+            ''', (item_id, days))
             return self.cursor.fetchall()
         except:
             return []
@@ -290,24 +684,32 @@ class Database:
     def get_price_trend(self, item_id):
         """Calculates price trend (% change) over last 30 days."""
         try:
-            history = self.get_price_history(item_id, days=30)
-            if len(history) < 2:
+            # Only the newest and oldest points matter, so pick them server-side instead of pulling the whole history
+            self.cursor.execute('''
+                SELECT COUNT(*),
+                       (ARRAY_AGG(price_new ORDER BY scraped_at DESC))[1],
+                       (ARRAY_AGG(price_new ORDER BY scraped_at ASC))[1],
+                       (ARRAY_AGG(price_used ORDER BY scraped_at DESC))[1],
+                       (ARRAY_AGG(price_used ORDER BY scraped_at ASC))[1]
+                FROM price_history
+                WHERE item_id = %s AND scraped_at > NOW() - INTERVAL '30 days'
+            ''', (item_id,))
+            count, latest_new, oldest_new, latest_used, oldest_used = self.cursor.fetchone()
+            if count < 2:
                 return None
             
-            latest = history[0]
-            oldest = history[-1]
-            
             trend = {}
-            if latest[0] and oldest[0]:  # price_new
-                change = ((latest[0] - oldest[0]) / oldest[0]) * 100
+            if latest_new and oldest_new:
+                change = ((latest_new - oldest_new) / oldest_new) * 100
                 trend['new_change_pct'] = round(change, 1)
             
-            if latest[1] and oldest[1]:  # price_used
-                change = ((latest[1] - oldest[1]) / oldest[1]) * 100
+            if latest_used and oldest_used:
+                change = ((latest_used - oldest_used) / oldest_used) * 100
                 trend['used_change_pct'] = round(change, 1)
             
             return trend
         except:
+            self.conn.rollback()
             return None
 
     def close(self):
@@ -0,0 +1,17 @@
+import re
+from functools import lru_cache
+
+# IDs left behind by stray test runs / shell invocations (Postgres regex, matched case-insensitively in SQL)
+JUNK_PATTERN = r"(?:python|streamlit|test|runner|cmd)|^n$"
+_JUNK_RE = re.compile(JUNK_PATTERN, re.IGNORECASE)
+
+def is_junk_id(item_id):
+    return len(item_id) < 2 or _JUNK_RE.search(item_id) is not None
+
+# Minifig IDs carry letters (e.g. sw0450); set IDs are numeric with an optional -N suffix
+FIG_PATTERN = r"[^\W\d_]"  # Any letter; load_data applies the same pattern column-wise
+_FIG_RE = re.compile(FIG_PATTERN)
+
+@lru_cache(maxsize=8192)
+def is_fig_id(item_id):
+    return _FIG_RE.search(item_id) is not None
@@ -0,0 +1,73 @@
+from database import Database, ITEM_SUMMARY_VIEW
+from backfill_inventory_edges import backfill_inventory_edges
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+def _column_type(db, table, column):
+    """data_type of a column in the connection's own schema, or None if it doesn't exist."""
+    db.cursor.execute('''
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s
+    ''', (table, column))
+    row = db.cursor.fetchone()
+    return row[0] if row else None
+
+def migrate_items_to_jsonb(db):
+    """
+    Switches items.json_data from TEXT to JSONB: Postgres stores the parsed form, so server-side
+    extraction (json_data -> 'meta') skips re-parsing and reads come back as dicts.
+    Runs in its own transaction; if a corrupted blob blocks the cast, the column stays TEXT.
+    """
+    try:
+        data_type = _column_type(db, 'items', 'json_data')
+        if data_type and data_type != 'jsonb':
+            # The view depends on the column, so it is rebuilt around the type change
+            db.cursor.execute('DROP VIEW IF EXISTS item_summary;')
+            db.cursor.execute('ALTER TABLE items ALTER COLUMN json_data TYPE JSONB USING json_data::jsonb;')
+            db.cursor.execute(ITEM_SUMMARY_VIEW)
+            logging.info("Migrated items.json_data to JSONB")
+        db.conn.commit()
+    except Exception as e:
+        db.conn.rollback()
+        logging.error(f"JSONB Migration Failed: {e}")
+
+def compress_json_lz4(db):
+    """
+    Large JSON blobs are TOAST-compressed by Postgres; lz4 decompresses several times faster than the
+    default pglz on the load path. Needs PG14+ built with lz4, so a failure here is not fatal.
+    Existing rows switch over as they are rewritten by save_item.
+    """
+    try:
+        db.cursor.execute('ALTER TABLE items ALTER COLUMN json_data SET COMPRESSION lz4;')
+        db.cursor.execute('ALTER TABLE inventory_lists ALTER COLUMN json_data SET COMPRESSION lz4;')
+        db.conn.commit()
+    except Exception as e:
+        db.conn.rollback()
+        logging.warning(f"lz4 column compression unavailable: {e}")
+
+def set_timestamp_defaults(db):
+    """Tables created before the column defaults get NOW() too, for rows inserted outside Database."""
+    try:
+        db.cursor.execute('ALTER TABLE items ALTER COLUMN updated_at SET DEFAULT NOW();')
+        db.cursor.execute('ALTER TABLE inventory_lists ALTER COLUMN updated_at SET DEFAULT NOW();')
+        db.cursor.execute('ALTER TABLE collections ALTER COLUMN added_at SET DEFAULT NOW();')
+        db.cursor.execute('ALTER TABLE price_history ALTER COLUMN scraped_at SET DEFAULT NOW();')
+        db.conn.commit()
+    except Exception as e:
+        db.conn.rollback()
+        logging.error(f"Timestamp Defaults Failed: {e}")
+
+def migrate_schema():
+    """One-time schema changes for databases created by older versions; safe to re-run."""
+    db = Database()
+    try:
+        migrate_items_to_jsonb(db)
+        compress_json_lz4(db)
+        set_timestamp_defaults(db)
+        backfill_inventory_edges(db)  # Fig counts and owned-via-set lookups read the edges
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate_schema()
@@ -1,6 +1,6 @@
 import streamlit as st
-from database import Database
 from pricing_engine import PriceAnalyzer
+from superhero_pages import gallery_html, load_superhero_items
 import pandas as pd
 
 st.set_page_config(page_title="DC Database 🦸", page_icon="🦇", layout="wide")
@@ -9,9 +9,6 @@ st.set_page_config(page_title="DC Database 🦸", page_icon="🦇", layout="wide
 st.title("🦇 DC Minifigure Database")
 st.markdown("**DC Universe Collection (2005+)**")
 
-# Initialize
-db = Database()
-
 # DC character keywords for filtering
 DC_KEYWORDS = [
     "batman", "robin", "joker", "harley quinn", "catwoman", "penguin", "riddler",
@@ -35,7 +32,7 @@ DC_KEYWORDS = [
 @st.cache_data(ttl=10)  # Reduced TTL for debugging
 def load_dc_data():
     """Loads all DC superhero minifigures from database."""
-    raw_items = db.get_items_by_prefix("sh")
+    raw_items = load_superhero_items()
     
     display_data = []
     for data in raw_items:
@@ -185,20 +182,16 @@ def render_category_table(category_df, category_name):
     st.caption(f"Showing {len(filtered_df)} of {len(category_df)} figures")
     
     if view_mode == "Gallery":
-        # Gallery view
+        # Gallery view: one HTML grid for all cards
         cols_per_row = 5
-        for i in range(0, len(filtered_df), cols_per_row):
-            cols = st.columns(cols_per_row)
-            for j, col in enumerate(cols):
-                if i + j < len(filtered_df):
-                    row = filtered_df.iloc[i + j]
-                    with col:
-                        st.image(row["img"], use_container_width=True)
-                        st.caption(f"**{row['id']}**")
-                        st.caption(f"{row['name'][:30]}...")
-                        st.caption(f"📅 {row['year']}")
-                        st.caption(f"💰 New: {row['new_price']:.0f} ₪")
-                        st.caption(f"💵 Used: {row['used_price']:.0f} ₪")
+        st.markdown(
+            gallery_html(filtered_df, [
+                "📅 " + filtered_df["year"].astype(str),
+                "💰 New: " + filtered_df["new_price"].map("{:.0f}".format) + " ₪",
+                "💵 Used: " + filtered_df["used_price"].map("{:.0f}".format) + " ₪",
+            ], cols_per_row),
+            unsafe_allow_html=True
+        )
     else:
         # Table view
         st.dataframe(
@@ -238,5 +231,3 @@ with tab2:
 
 with tab3:
     render_category_table(df_big_figs, "Big Figures")
-
-db.close()
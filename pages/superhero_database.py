@@ -1,6 +1,6 @@
 import streamlit as st
-from database import Database
 from pricing_engine import PriceAnalyzer
+from superhero_pages import gallery_html, load_superhero_items
 import pandas as pd
 
 st.set_page_config(page_title="Superhero Database 🦸", page_icon="🦸", layout="wide")
@@ -9,14 +9,11 @@ st.set_page_config(page_title="Superhero Database 🦸", page_icon="🦸", layou
 st.title("🦸 Superhero Minifigure Database")
 st.markdown("**Marvel & DC Universe Collection (2005+)**")
 
-# Initialize
-db = Database()
-
 # Load all superhero minifigures
 @st.cache_data(ttl=60)
 def load_superhero_data():
     """Loads all superhero minifigures (sh prefix) from database."""
-    raw_items = db.get_items_by_prefix("sh")
+    raw_items = load_superhero_items()
     
     display_data = []
     for data in raw_items:
@@ -147,19 +144,16 @@ def render_category_table(category_df, category_name):
     view_mode = st.radio("View Mode", ["Gallery", "Table"], horizontal=True, key=f"view_{category_name}")
     
     if view_mode == "Gallery":
-        # Gallery view
+        # Gallery view: one HTML grid for all cards
         items_per_row = 5
-        rows = [filtered_df.iloc[i:i+items_per_row] for i in range(0, min(len(filtered_df), 100), items_per_row)]
-        
-        for row_data in rows:
-            cols = st.columns(items_per_row)
-            for idx, (_, item) in enumerate(row_data.iterrows()):
-                with cols[idx]:
-                    st.image(item["img"], use_container_width=True)
-                    st.caption(f"**{item['id']}**")
-                    st.caption(f"{item['name'][:30]}...")
-                    st.caption(f"💰 {item['used_price']:.0f} ₪")
-                    st.caption(f"📅 {item['year']}")
+        shown = filtered_df.head(100)
+        st.markdown(
+            gallery_html(shown, [
+                "💰 " + shown["used_price"].map("{:.0f}".format) + " ₪",
+                "📅 " + shown["year"].astype(str),
+            ], items_per_row),
+            unsafe_allow_html=True
+        )
         
         if len(filtered_df) > 100:
             st.info("⚠️ Showing first 100 results in gallery view. Use table view or search to see more.")
@@ -95,6 +95,34 @@ class PriceAnalyzer:
         results["meta"] = self.meta
         return results
 
+    @staticmethod
+    def summary_columns(analyses: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+        """
+        Flattens several analyze() results into column lists (one entry per analysis).
+        
+        Args:
+            analyses (List[Dict]): Results of analyze().
+            
+        Returns:
+            Dict: item_name, year_released, new_price, new_conf, used_price, used_conf,
+                  profit_abs, margin_pct and rating columns.
+        """
+        cols = {k: [] for k in ("item_name", "year_released", "new_price", "new_conf", "used_price",
+                                "used_conf", "profit_abs", "margin_pct", "rating")}
+        for a in analyses:
+            meta, new, used = a.get("meta", {}), a.get("new", {}), a.get("used", {})
+            sniper = a.get("deep_dive", {}).get("sniper") or {}
+            cols["item_name"].append(meta.get("item_name", "Unknown"))
+            cols["year_released"].append(meta.get("year_released"))
+            cols["new_price"].append(new.get("market_price", 0))
+            cols["new_conf"].append(new.get("confidence", "N/A"))
+            cols["used_price"].append(used.get("market_price", 0))
+            cols["used_conf"].append(used.get("confidence", "N/A"))
+            cols["profit_abs"].append(sniper.get("profit_abs", 0))
+            cols["margin_pct"].append(sniper.get("margin_pct", 0))
+            cols["rating"].append(sniper.get("rating", "N/A"))
+        return cols
+
     def _analyze_condition(self, condition: str, minifig_val: float = 0.0) -> Dict[str, Any]:
         """
         Calculates market metrics for a specific condition (New/Used).
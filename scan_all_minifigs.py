@@ -1,7 +1,6 @@
 import time
 import logging
 import sys
-from datetime import datetime
 from scraper import BrickLinkScraper
 from database import Database
 
@@ -68,6 +67,9 @@ def main():
             errors = 0
             consecutive_failures = 0
             
+            # Preload the fresh (< 30 days old) IDs for the whole theme range in one query
+            fresh_ids = db.get_fresh_item_ids([f"{theme_prefix}{n:04d}" for n in range(start, end + 1)])
+            
             num = start
             while num <= end:
                 item_id = f"{theme_prefix}{num:04d}"
@@ -77,20 +79,8 @@ def main():
                 sys.stdout.write(f"\r[{progress:.1f}%] {item_id} | ✅ {cached} | 🌐 {scanned} | ❌ {errors} | ")
                 sys.stdout.flush()
                 
-                # Check DB for existing data
-                cached_item = db.get_item(item_id)
-                use_cache = False
-                
-                if cached_item and "error" not in cached_item:
-                    last_updated = cached_item.get("meta", {}).get("timestamp") or cached_item.get("meta", {}).get("cache_date")
-                    if last_updated:
-                        try:
-                            last_date = datetime.fromisoformat(last_updated.split('T')[0])
-                            days_diff = (datetime.now() - last_date).days
-                            if days_diff < 30:
-                                use_cache = True
-                        except:
-                            use_cache = True
+                # Check preloaded freshness
+                use_cache = item_id in fresh_ids
 
                 if use_cache:
                     cached += 1
@@ -1,7 +1,6 @@
 import time
 import logging
 import sys
-from datetime import datetime
 from scraper import BrickLinkScraper
 from database import Database
 from selenium.webdriver.common.by import By
@@ -125,25 +124,16 @@ def main():
             cached = 0
             errors = 0
             
+            # Preload the fresh (< 30 days old) IDs for the whole category in one query
+            fresh_ids = db.get_fresh_item_ids(item_ids)
+            
             for idx, item_id in enumerate(item_ids):
                 progress = ((idx + 1) / len(item_ids)) * 100
                 sys.stdout.write(f"\r[{progress:.1f}%] {item_id} | ✅ {cached} | 🌐 {scanned} | ❌ {errors} | ")
                 sys.stdout.flush()
                 
-                # Check cache
-                cached_item = db.get_item(item_id)
-                use_cache = False
-                
-                if cached_item and "error" not in cached_item:
-                    last_updated = cached_item.get("meta", {}).get("timestamp") or cached_item.get("meta", {}).get("cache_date")
-                    if last_updated:
-                        try:
-                            last_date = datetime.fromisoformat(last_updated.split('T')[0])
-                            days_diff = (datetime.now() - last_date).days
-                            if days_diff < 30:
-                                use_cache = True
-                        except:
-                            use_cache = True
+                # Check preloaded freshness
+                use_cache = item_id in fresh_ids
                 
                 if use_cache:
                     cached += 1
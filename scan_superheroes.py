@@ -1,7 +1,6 @@
 import time
 import logging
 import sys
-from datetime import datetime
 from scraper import BrickLinkScraper
 from database import Database
 
@@ -46,6 +45,9 @@ def main():
     print(f"   Cache Freshness: 30 days")
     print("\n🚀 Starting scan...\n")
     
+    # Preload the fresh (< 30 days old) IDs for the whole range in one query
+    fresh_ids = db.get_fresh_item_ids([f"sh{n:04d}" for n in range(START, END + 1)])
+    
     try:
         num = START
         while num <= END:
@@ -56,20 +58,8 @@ def main():
             sys.stdout.write(f"\r[{progress:.1f}%] {item_id} | ✅ {cached} | 🌐 {scanned} | ❌ {errors} | ")
             sys.stdout.flush()
             
-            # 1. Check DB for existing data
-            cached_item = db.get_item(item_id)
-            use_cache = False
-            
-            if cached_item and "error" not in cached_item:
-                last_updated = cached_item.get("meta", {}).get("timestamp") or cached_item.get("meta", {}).get("cache_date")
-                if last_updated:
-                    try:
-                        last_date = datetime.fromisoformat(last_updated.split('T')[0])
-                        days_diff = (datetime.now() - last_date).days
-                        if days_diff < 30:
-                            use_cache = True
-                    except:
-                        use_cache = True
+            # 1. Check preloaded freshness
+            use_cache = item_id in fresh_ids
 
             if use_cache:
                 cached += 1
@@ -63,7 +63,11 @@ class BrickLinkScraper:
             print(f"Inventory Error: {e}")
             return []
 
-    def scrape(self, item_id: str, item_type: str = 'S', force: bool = False) -> Dict[str, Any]:
+    def scrape(self, item_id: str, item_type: str = 'S', force: bool = False, save: bool = True) -> Dict[str, Any]:
+        """
+        Scrapes an item's price guide (or returns the stored copy unless `force`).
+        With `save=False` the caller persists the result itself, e.g. in one batch with its analysis.
+        """
         self.current_type = item_type
         if not force:
             cached = self.db.get_item(item_id)
@@ -85,7 +89,8 @@ class BrickLinkScraper:
             time.sleep(1.5) # ביטחון נוסף לטעינה מלאה של כל השורות
 
             data = self._parse_html(item_id, driver.page_source)
-            self.db.save_item(item_id, data)
+            if save:
+                self.db.save_item(item_id, data)
             return data
         except Exception as e:
             # Return error dict instead of crashing, keep driver open
@@ -0,0 +1,37 @@
+import html
+from database import Database
+
+# Shared by the superhero minifigure pages (pages/); lives outside pages/ so Streamlit doesn't list it as a page
+
+# Gallery card markup (image + caption block), filled per row with pandas string ops
+GALLERY_CARD_OPEN = '<div><img src="'
+GALLERY_IMG_CLOSE = '" loading="lazy" style="width: 100%; aspect-ratio: 1; object-fit: contain;">'
+GALLERY_CAPTION_OPEN = '<div style="font-size: 14px; color: #808495; line-height: 1.5; margin-top: 4px;">'
+GALLERY_GRID = '<div style="display: grid; grid-template-columns: repeat({cols}, 1fr); gap: 16px;">{cards}</div>'
+
+def gallery_html(df, caption_lines, cols_per_row=5):
+    """
+    One HTML grid of figure cards for a frame with img/id/name columns; every card is built with
+    column string ops, so the page sends a single markdown block.
+    `caption_lines` are string Series (aligned with df) shown under the bold ID and the shortened name.
+    """
+    cards = (
+        GALLERY_CARD_OPEN + df["img"] + GALLERY_IMG_CLOSE
+        + GALLERY_CAPTION_OPEN + "<b>" + df["id"].map(html.escape) + "</b><br>"
+        + df["name"].str[:30].map(html.escape) + "..."
+    )
+    for line in caption_lines:
+        cards = cards + "<br>" + line
+    cards = cards + "</div></div>"
+    return GALLERY_GRID.format(cols=cols_per_row, cards=cards.str.cat())
+
+def load_superhero_items():
+    """
+    Every stored sh-prefixed item. Opens its own connection: pages call this from their
+    st.cache_data loader, so reruns served from the cache skip the connection handshake.
+    """
+    db = Database()
+    try:
+        return db.get_items_by_prefix("sh")
+    finally:
+        db.close()
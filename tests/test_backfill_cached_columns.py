@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("simdjson")
+
+from backfill_cached_columns import _load_item
+
+ITEM = {
+    "meta": {"item_name": "Millennium Falcon", "year_released": 2017},
+    "new": {"sold": [{"price": 700.0, "currency": "USD"}], "stock": []},
+    "used": [],
+    "inventory": [{"id": "sw0450", "qty": 1}],  # Not read by PriceAnalyzer
+}
+
+
+def test_load_item_keeps_only_analyzer_branches():
+    assert _load_item(json.dumps(ITEM)) == {k: ITEM[k] for k in ("meta", "new", "used")}
+
+
+def test_load_item_returns_plain_python():
+    data = _load_item(json.dumps(ITEM).encode())
+    assert type(data["meta"]) is dict
+    assert type(data["new"]["sold"]) is list
+    assert type(data["used"]) is list
+
+
+def test_load_item_scalar_and_missing_branches():
+    assert _load_item('{"meta": null, "new": "n/a"}') == {"meta": None, "new": "n/a"}
+
+
+def test_load_item_survives_parser_reuse():
+    # Results must not point into the parser buffer that the next row overwrites
+    first = _load_item(json.dumps(ITEM))
+    _load_item(json.dumps({"meta": {"item_name": "x" * 500}, "new": [1, 2, 3]}))
+    assert first["meta"] == ITEM["meta"]
+    assert first["new"] == ITEM["new"]
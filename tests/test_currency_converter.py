@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("requests")
+
+from currency_converter import FALLBACK_RATES, CurrencyConverter
+
+
+@pytest.fixture(autouse=True)
+def fixed_rates(monkeypatch):
+    # No network: every lookup sees the static fallback table
+    rates = dict(FALLBACK_RATES)
+    monkeypatch.setattr(CurrencyConverter, "get_rates", staticmethod(lambda: rates))
+    return rates
+
+
+def test_convert_series_to_ils():
+    result = CurrencyConverter.convert_series_to_ils([10, 2.5, 100], ["USD", "eur", "ILS"])
+    np.testing.assert_array_equal(result, [32.0, 9.88, 100.0])
+
+
+def test_unknown_codes_pass_through():
+    # Codes sorting before, between and after the known ones all fall back to a 1.0 rate
+    result = CurrencyConverter.convert_series_to_ils([5, 5, 5], ["AAA", "DKK", "ZZZ"])
+    np.testing.assert_array_equal(result, [5.0, 5.0, 5.0])
+
+
+def test_matches_scalar_conversion():
+    amounts = [19.99, 7, 0, 123.45, 3]
+    codes = ["GBP", "CAD", "USD", "AUD", "XYZ"]
+    expected = [CurrencyConverter.convert_to_ils(a, c) for a, c in zip(amounts, codes)]
+    np.testing.assert_allclose(CurrencyConverter.convert_series_to_ils(amounts, codes), expected)
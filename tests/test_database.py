@@ -0,0 +1,47 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from database import copy_buffer, copy_field, fresh_item_ids
+
+
+def test_copy_field_null():
+    assert copy_field(None) == "\\N"
+
+
+def test_copy_field_escapes_separators():
+    assert copy_field("a\tb\nc\rd\\e") == "a\\tb\\nc\\rd\\\\e"
+
+
+def test_copy_field_literal_backslash_n_is_not_null():
+    # A stored "\N" string must not round-trip as NULL
+    assert copy_field("\\N") == "\\\\N"
+
+
+def test_copy_field_stringifies():
+    assert copy_field(12.5) == "12.5"
+
+
+def test_copy_buffer_rows():
+    buf = copy_buffer([("75001", None, "x\ty"), ("sw0450", 3, "")])
+    assert buf.read() == "75001\t\\N\tx\\ty\nsw0450\t3\t\n"
+
+
+TODAY = date(2026, 3, 31)
+
+
+def test_fresh_item_ids_cutoff():
+    freshness = {
+        "new": "2026-03-30 12:00:00",
+        "edge": "2026-03-01 23:59:59",  # Exactly max_age_days old: due for a re-scrape
+        "day_after": "2026-03-02 00:00:00",
+        "old": "2025-12-01 08:00:00",
+    }
+    assert fresh_item_ids(freshness, max_age_days=30, today=TODAY) == {"new", "day_after"}
+
+
+def test_fresh_item_ids_missing_and_unreadable_dates():
+    freshness = {"missing": None, "empty": "", "garbled": "not a date"}
+    assert fresh_item_ids(freshness, today=TODAY) == {"garbled"}
@@ -0,0 +1,24 @@
+import pytest
+
+from item_ids import is_fig_id, is_junk_id
+
+
+@pytest.mark.parametrize("item_id", ["sw0450", "sh0001", "nba001", "col123", "SW0450"])
+def test_ids_with_letters_are_figs(item_id):
+    assert is_fig_id(item_id)
+
+
+@pytest.mark.parametrize("item_id", ["75001", "75001-1", "10221-2", "_0001"])
+def test_numeric_set_ids_are_not_figs(item_id):
+    assert not is_fig_id(item_id)
+
+
+@pytest.mark.parametrize("item_id", ["", "n", "N", "PYTHON", "test123", "cmd", "streamlit_run"])
+def test_junk_ids(item_id):
+    assert is_junk_id(item_id)
+
+
+@pytest.mark.parametrize("item_id", ["nba001", "sh0001", "75001", "sw0450", "n1"])
+def test_real_ids_are_not_junk(item_id):
+    # "^n$" is anchored: IDs that merely start with n must survive
+    assert not is_junk_id(item_id)
@@ -0,0 +1,33 @@
+from pricing_engine import PriceAnalyzer
+
+
+def test_summary_columns():
+    analyses = [
+        {
+            "meta": {"item_name": "Death Star", "year_released": 2016},
+            "new": {"market_price": 1500.0, "confidence": "High"},
+            "used": {"market_price": 900.0, "confidence": "Medium"},
+            "deep_dive": {"sniper": {"profit_abs": 250.0, "margin_pct": 18.5, "rating": "BUY"}},
+        },
+        # Nothing scraped yet: every column falls back to its default
+        {},
+        # Deep scan ran but found no sniper opportunity
+        {"meta": {"item_name": "Batman"}, "deep_dive": {"sniper": None}},
+    ]
+    assert PriceAnalyzer.summary_columns(analyses) == {
+        "item_name": ["Death Star", "Unknown", "Batman"],
+        "year_released": [2016, None, None],
+        "new_price": [1500.0, 0, 0],
+        "new_conf": ["High", "N/A", "N/A"],
+        "used_price": [900.0, 0, 0],
+        "used_conf": ["Medium", "N/A", "N/A"],
+        "profit_abs": [250.0, 0, 0],
+        "margin_pct": [18.5, 0, 0],
+        "rating": ["BUY", "N/A", "N/A"],
+    }
+
+
+def test_summary_columns_empty():
+    cols = PriceAnalyzer.summary_columns([])
+    assert all(values == [] for values in cols.values())
+    assert len(cols) == 9